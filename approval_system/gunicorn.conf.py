@@ -0,0 +1,112 @@
+"""
+Gunicorn configuration for approval_system.
+
+    gunicorn -c approval_system/gunicorn.conf.py
+
+Tuned through environment variables:
+
+    GUNICORN_WORKER_CLASS   sync (default), gthread or uvicorn
+    GUNICORN_WORKERS        default derived from the CPU count
+    GUNICORN_THREADS        threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS   recycle a worker after N requests (default 1000)
+    GUNICORN_PRELOAD        1 (default) loads and warms Django once in the master
+    GUNICORN_WARMUP         1 (default) warms URLs, templates and DB connections
+    PORT                    default 8000
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'approval_system.settings')
+
+cpus = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Worker class
+# sync:    one request per process, (2 x CPU) + 1 processes
+# gthread: threads share a process, fewer processes needed
+# uvicorn: ASGI through approval_system/asgi.py (pip install uvicorn)
+worker_mode = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+
+if worker_mode == 'uvicorn':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'approval_system.asgi:application'
+    default_workers = cpus
+elif worker_mode == 'gthread':
+    worker_class = 'gthread'
+    wsgi_app = 'approval_system.wsgi:application'
+    threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+    default_workers = cpus + 1
+else:
+    worker_class = 'sync'
+    wsgi_app = 'approval_system.wsgi:application'
+    default_workers = cpus * 2 + 1
+
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
+
+# Recycle workers to bound slow memory growth; the jitter
+# keeps them from all restarting at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Import Django once in the master; workers share the
+# loaded code copy-on-write and start in milliseconds
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+warmup = os.environ.get('GUNICORN_WARMUP', '1') == '1'
+
+accesslog = '-'
+errorlog = '-'
+
+
+# =========================================================
+# SERVER HOOKS
+# =========================================================
+def when_ready(server):
+    """
+    Master, after preloading and before the first fork.
+    """
+
+    if not preload_app:
+        return
+
+    from core.warmup import release_connections, warm_up
+
+    if warmup:
+        patterns, templates = warm_up()
+        server.log.info("Warmed up %s URL patterns and %s templates", patterns, templates)
+
+    # Whatever the preload opened must not leak into workers
+    release_connections()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+
+    from core.warmup import release_connections
+
+    release_connections()
+
+
+def post_worker_init(worker):
+    """
+    Worker, app loaded, before it accepts requests.
+    """
+
+    if not warmup:
+        return
+
+    from core.warmup import open_connections, warm_up
+
+    if not preload_app:
+        warm_up()
+
+    # Connections are per thread: only the sync worker serves
+    # requests on the thread that runs this hook
+    if worker_class == 'sync':
+        open_connections()
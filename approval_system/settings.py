@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 ALLOWED_HOSTS = ["*"]
 
 AUTH_USER_MODEL = 'core.User'
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +52,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.tenancy.TenantMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -78,13 +81,194 @@ WSGI_APPLICATION = 'approval_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# Configured from the environment. Without DB_ENGINE the
+# development SQLite file is used, exactly as before.
+#
+#   DB_ENGINE=postgres DB_NAME=approvals DB_USER=... DB_PASSWORD=...
+#   DB_HOST=db.internal DB_PORT=5432
+#
+#   DB_CONN_MAX_AGE   seconds to keep a connection open (default 60)
+#   DB_POOL=1         Django's built-in pool (psycopg-pool, in requirements.txt)
+#   DB_PGBOUNCER=1    running behind pgbouncer in transaction mode
+#   DB_REPLICA_HOST   read replica for dashboard / audit reads
+#
+#   DB_SQLITE_PROFILE=performance   WAL + tuned pragmas for SQLite
+
+SQLITE_PERFORMANCE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA busy_timeout=20000;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA temp_store=MEMORY;'
+)
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'approval_system'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+
+    if os.environ.get('DB_POOL') == '1':
+        # The pool owns connection lifetime; Django refuses
+        # a persistent CONN_MAX_AGE together with it.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX', '10')),
+        }
+
+    if os.environ.get('DB_PGBOUNCER') == '1':
+        # Named server-side cursors don't survive transaction pooling.
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {},
+        }
+    }
+
+    if os.environ.get('DB_SQLITE_PROFILE') == 'performance':
+        # Single-node deployments: readers no longer block the
+        # writer, and writers wait instead of failing with
+        # "database is locked".
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': SQLITE_PERFORMANCE_PRAGMAS,
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        }
+
+# Finished tasks are archived into their own tables; with
+# ARCHIVE_DB_NAME they live in a separate database instead
+# (same engine and server as "default").
+ARCHIVE_DATABASE = 'default'
+
+if os.environ.get('ARCHIVE_DB_NAME'):
+    DATABASES['archive'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['ARCHIVE_DB_NAME'],
+    }
+    ARCHIVE_DATABASE = 'archive'
+
+# Finished tasks older than this are moved out by `archive_tasks`
+ARCHIVE_AFTER_DAYS = 90
+
+# Dedicated databases for large tenants: {organization id: alias}.
+# The alias must also be in DATABASES and holds a full copy of the
+# schema; `mirror_tenant_users` copies that organization's users,
+# teams and holidays into it.
+TENANT_DATABASES = {}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# REDIS_URL (e.g. redis://cache.internal:6379/1) shares the cache
+# between processes; otherwise each process has its own memory cache.
+#
+# Entries that other processes invalidate (signed-in users, delegation
+# maps, unread counters, SLA calendars) are only kept for long when the
+# cache is shared; with per-process memory they expire within seconds.
+SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'approval-system',
+            # Room for one fragment per dashboard row.
+            'OPTIONS': {'MAX_ENTRIES': 50000},
+        }
+    }
+
+# Time-to-decision target per urgency, used by the analytics rollups
+SLA_TARGET_HOURS = {
+    'CRITICAL': 4,
+    'HIGH': 8,
+    'MEDIUM': 24,
+    'LOW': 48,
 }
 
+# Business-hours SLA clock: days precomputed around today
+SLA_CALENDAR_DAYS_BACK = 400
+SLA_CALENDAR_DAYS_AHEAD = 7
+# Calendars are rebuilt at least this often; with a shared cache a
+# change to hours or holidays reaches every process within seconds
+SLA_CALENDAR_MAX_AGE = 60 * 60 if SHARED_CACHE else 60
+
+# Checkpoint of `send_approval_reminders --daemon`
+REMINDER_DAEMON_STATE_FILE = BASE_DIR / '.reminder_daemon.json'
+
+# Responses remembered per Idempotency-Key (create / decide / snooze)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Outbound webhooks (`deliver_webhooks` worker)
+WEBHOOK_TIMEOUT_SECONDS = 5
+WEBHOOK_CONCURRENCY = 20
+
+# Rendered dashboard rows are cached per (task id, updated_at),
+# so a stale row can never be served after the task changes.
+DASHBOARD_ROW_CACHE_SECONDS = 60 * 60
+
+# Per-request profiling (core.profiling), off unless PROFILE_REQUESTS=1.
+# Then staff can profile a request with the "X-Profile" header
+# ("cprofile" for cProfile instead of stack samples), and a share
+# of all requests is profiled at PROFILE_SAMPLE_RATE (0.0 - 1.0).
+PROFILING_ENABLED = os.environ.get('PROFILE_REQUESTS') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+
+
+# Sessions / authentication
+# SESSION_BACKEND: "cached_db" (default, cache in front of the
+# session table), "cache" (cache only - use with Redis) or "db".
+
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+}[os.environ.get('SESSION_BACKEND', 'cached_db')]
+
+# Logged-in users are loaded from the cache (with organization and
+# team) and dropped from it whenever they, their organization or
+# their team are saved. Bulk .update() calls send no signal, so the
+# lifetime stays short: that is how long such a change can lag.
+AUTHENTICATION_BACKENDS = ['core.backends.CachedModelBackend']
+AUTH_USER_CACHE_SECONDS = 30 if SHARED_CACHE else 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -122,7 +306,7 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 # Email Configuration (Gmail SMTP)
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -14,4 +14,8 @@ urlpatterns = [
     path('reject/<int:task_id>/', views.reject_task, name='reject'),
     path('snooze/<int:task_id>/<int:hours>/', views.snooze_task, name='snooze'),
     path('audit/<int:task_id>/', views.audit_timeline, name='audit'),
+    path('analytics/', views.analytics_report, name='analytics'),
+    path('search/', views.search_view, name='search'),
+    path('notifications/', views.notifications_view, name='notifications'),
+    path('notifications/read/', views.mark_notifications_read, name='notifications_read'),
 ]
@@ -1,22 +1,300 @@
-from django.contrib import admin
-from .models import Organization, Team, User, ApprovalTask
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Organization, Team, User, ApprovalTask, Holiday
+from .models import AuditLog
+from .models import Workflow, WorkflowStage, ApprovalStep
+from .models import WebhookEndpoint, WebhookDelivery
+from .models import DelegationRule
+from . import archive
+from .notifications import batched, notify
+
+
+# =========================================================
+# LARGE TABLES
+# An exact COUNT(*) over millions of rows is the slowest
+# query on a changelist page. Unfiltered lists use the
+# database's own row estimate instead.
+# =========================================================
+def estimated_row_count(model):
+    """
+    Cheap row estimate from the database statistics (None if unknown).
+    """
+
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == "sqlite":
+            # Max rowid: one index seek, exact unless rows were deleted
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+
+    # reltuples is -1 / 0 before the first ANALYZE
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this an exact count is cheap enough
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate and estimate > self.exact_count_limit:
+                return estimate
+
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # No second COUNT(*) for the "N total" next to filtered results
+    show_full_result_count = False
+    list_per_page = 50
+
+
+# =========================================================
+# ORGANIZATIONS & USERS
+# =========================================================
+class HolidayInline(admin.TabularInline):
+    model = Holiday
+    extra = 1
+
+
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ('name', 'domain', 'created_at')
+    list_display = ('name', 'domain', 'work_start', 'work_end', 'created_at')
+    search_fields = ('name', 'domain')
+    inlines = [HolidayInline]
+
+
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
     list_display = ('name', 'organization')
+    list_select_related = ('organization',)
+    search_fields = ('name',)
+    autocomplete_fields = ('organization',)
+
+
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdmin):
     list_display = ('username', 'email', 'role', 'organization', 'team')
     list_filter = ('role', 'organization')
+    list_select_related = ('organization', 'team')
+    search_fields = ('username', 'email')
+    autocomplete_fields = ('organization', 'team')
+
+
+@admin.register(DelegationRule)
+class DelegationRuleAdmin(admin.ModelAdmin):
+    list_display = ('delegator', 'delegate', 'starts_at', 'ends_at', 'urgency', 'team', 'is_active')
+    list_filter = ('is_active',)
+    list_select_related = ('delegator', 'delegate', 'team')
+    autocomplete_fields = ('delegator', 'delegate', 'team')
+    exclude = ('organization',)
+
+
+# =========================================================
+# APPROVAL TASKS
+# =========================================================
+class ReassignActionForm(ActionForm):
+    approver = forms.IntegerField(
+        required=False,
+        label="Reassign to user id",
+    )
+
+
 @admin.register(ApprovalTask)
-class ApprovalTaskAdmin(admin.ModelAdmin):
-    list_display = ('title', 'status', 'approver', 'created_at')
+class ApprovalTaskAdmin(LargeTableAdmin):
+    list_display = ('title', 'status', 'urgency', 'approver', 'created_at')
+    list_filter = ('status', 'urgency')
+    list_select_related = ('approver',)
+    search_fields = ('title',)
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ('requester', 'approver', 'organization', 'workflow')
     readonly_fields = ()  # temporarily allow edit
-from .models import AuditLog
+
+    action_form = ReassignActionForm
+    actions = ['approve_selected', 'reassign_selected', 'archive_selected']
+
+    # -----------------------------------------------------
+    # Bulk actions: lock the PENDING single-approver rows,
+    # change them with one UPDATE and write their audit
+    # rows with one INSERT. Workflow tasks are skipped;
+    # they are decided step by step. Returns the changed
+    # tasks, re-read after the commit for notify().
+    # -----------------------------------------------------
+    def _bulk_change(self, request, queryset, action, remarks, **changes):
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            locked = list(
+                queryset.filter(status='PENDING', stage_plan=[])
+                .select_for_update()
+                .values_list('id', 'organization_id')
+            )
+
+            ApprovalTask.objects.filter(id__in=[task_id for task_id, _ in locked]).update(
+                version=F('version') + 1,
+                updated_at=timezone.now(),
+                **changes,
+            )
+
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    task_id=task_id,
+                    organization_id=organization_id,
+                    action=action,
+                    performed_by=request.user,
+                    remarks=remarks,
+                )
+                for task_id, organization_id in locked
+            ])
+
+        return list(
+            ApprovalTask.objects.filter(id__in=[task_id for task_id, _ in locked])
+            .select_related('requester', 'approver')
+        )
+
+    @admin.action(description="Approve selected pending tasks")
+    def approve_selected(self, request, queryset):
+        changed = self._bulk_change(
+            request, queryset, 'APPROVED', "Approved in bulk from admin",
+            status='APPROVED',
+        )
+
+        with batched():
+            for task in changed:
+                notify(
+                    "APPROVED",
+                    task,
+                    [task.requester],
+                    f"\"{task.title}\" was approved by {request.user.username}",
+                    subject="Approval Approved",
+                    message=f"""
+Hello {task.requester.username},
+
+Your approval request "{task.title}" has been APPROVED.
+""",
+                )
+
+        self.message_user(request, f"{len(changed)} task(s) approved.")
+
+    @admin.action(description="Reassign selected pending tasks")
+    def reassign_selected(self, request, queryset):
+        # Only someone who can decide, and who sees the task on
+        # their (tenant-scoped) dashboard
+        approver = User.objects.filter(
+            pk=request.POST.get('approver') or None,
+            role__in=('MANAGER', 'ADMIN'),
+            organization__isnull=False,
+        ).first()
+
+        if approver is None:
+            self.message_user(request, "Enter the id of a manager or admin.", messages.ERROR)
+            return
+
+        changed = self._bulk_change(
+            request, queryset.filter(organization_id=approver.organization_id),
+            'REASSIGNED', f"Reassigned to {approver.username} from admin",
+            approver=approver,
+        )
+
+        with batched():
+            for task in changed:
+                notify(
+                    "REASSIGNED",
+                    task,
+                    [approver],
+                    f"\"{task.title}\" was reassigned to you by {request.user.username}",
+                    subject="New Approval Request",
+                    message=f"""
+Hello {approver.username},
+
+The approval request "{task.title}" from {task.requester.username} was reassigned to you.
+""",
+                )
+
+        self.message_user(
+            request,
+            f"{len(changed)} task(s) reassigned to {approver.username}. Tasks of other "
+            f"organizations, workflow tasks and decided tasks were left alone.",
+        )
+
+    @admin.action(description="Archive selected finished tasks")
+    def archive_selected(self, request, queryset):
+        # Same rules as archive_tasks, minus the age limit
+        moved = archive.archive_selected(queryset)
+        self.message_user(
+            request,
+            f"{moved} task(s) archived. Pending tasks and tasks whose events are not yet "
+            f"rolled up or delivered were left alone.",
+        )
+
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(LargeTableAdmin):
     list_display = ('task', 'action', 'performed_by', 'timestamp')
     list_filter = ('action',)
+    list_select_related = ('task', 'performed_by')
+    date_hierarchy = 'timestamp'
+    raw_id_fields = ('task', 'performed_by', 'organization')
+    # Edits are possible but break the hash chain (verify_audit_chain)
+    readonly_fields = ('timestamp', 'prev_hash', 'entry_hash')
+
+
+# =========================================================
+# WORKFLOWS
+# =========================================================
+class WorkflowStageInline(admin.TabularInline):
+    model = WorkflowStage
+    extra = 1
+    autocomplete_fields = ('approvers',)
+
+
+@admin.register(Workflow)
+class WorkflowAdmin(admin.ModelAdmin):
+    list_display = ('name', 'organization', 'created_at')
+    list_select_related = ('organization',)
+    search_fields = ('name',)
+    inlines = [WorkflowStageInline]
+
+
+@admin.register(ApprovalStep)
+class ApprovalStepAdmin(LargeTableAdmin):
+    list_display = ('task', 'stage', 'approver', 'status', 'decided_at')
+    list_filter = ('status',)
+    list_select_related = ('task', 'approver')
+    raw_id_fields = ('task', 'approver')
+
+
+# =========================================================
+# WEBHOOKS
+# =========================================================
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('url', 'organization', 'events', 'batch_size', 'is_active',
+                    'consecutive_failures', 'circuit_open_until')
+    list_filter = ('is_active',)
+    list_select_related = ('organization',)
+    autocomplete_fields = ('organization',)
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(LargeTableAdmin):
+    list_display = ('audit_log_id', 'endpoint', 'status', 'attempts', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status',)
+    list_select_related = ('endpoint__organization',)
+    raw_id_fields = ('endpoint', 'audit_log')
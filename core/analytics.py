@@ -0,0 +1,291 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import AnalyticsCursor, ArchivedAuditLog, AuditLog, DecisionRollup, User
+
+
+# =========================================================
+# LATENCY HISTOGRAM
+#
+# Log-spaced buckets: bucket i covers [GROWTH^i, GROWTH^(i+1))
+# seconds. Two histograms merge by adding counts, and any
+# percentile read back is within ~12% of the true value.
+# =========================================================
+
+GROWTH = 1.25
+
+DECISION_ACTIONS = ("APPROVED", "REJECTED")
+
+# Only audit rows at least this old are rolled up, so rows from
+# transactions still in flight (lower ids committing late) are
+# never skipped by the cursor.
+SAFETY_LAG = timedelta(minutes=1)
+
+
+def bucket_index(seconds):
+    return int(math.log(max(seconds, 1.0), GROWTH))
+
+
+def merge_histograms(target, other):
+    for index, count in other.items():
+        target[index] = target.get(index, 0) + count
+    return target
+
+
+def percentile(histogram, q):
+    """
+    Approximate q-th percentile (0..1) in seconds.
+    """
+
+    total = sum(histogram.values())
+    if not total:
+        return None
+
+    rank = q * total
+    seen = 0
+
+    for index in sorted(histogram, key=int):
+        seen += histogram[index]
+        if seen >= rank:
+            # Geometric middle of the bucket
+            return GROWTH ** (int(index) + 0.5)
+
+    return None
+
+
+# =========================================================
+# INCREMENTAL ROLLUP
+# =========================================================
+
+def _bucket_starts(moment):
+    hour = moment.replace(minute=0, second=0, microsecond=0)
+    return (("HOUR", hour), ("DAY", hour.replace(hour=0)))
+
+
+def _new_deltas():
+    # One delta per rollup row a chunk touches
+    return defaultdict(lambda: {
+        "decisions": 0, "approved": 0, "rejected": 0,
+        "sla_breaches": 0, "latency_histogram": {},
+    })
+
+
+def _add(deltas, action, timestamp, created_at, urgency, organization_id, team_id, approver_id):
+    latency = (timestamp - created_at).total_seconds()
+    breached = latency > settings.SLA_TARGET_HOURS.get(urgency, 24) * 3600
+    index = str(bucket_index(latency))
+
+    for granularity, start in _bucket_starts(timestamp):
+        delta = deltas[(granularity, start, organization_id, team_id, approver_id, urgency)]
+        delta["decisions"] += 1
+        delta["approved" if action == "APPROVED" else "rejected"] += 1
+        delta["sla_breaches"] += breached
+        histogram = delta["latency_histogram"]
+        histogram[index] = histogram.get(index, 0) + 1
+
+
+def roll_up(chunk_size=5000, cursor_name="decisions"):
+    """
+    Folds new decision audit rows into the rollup tables, one
+    chunk per transaction, and returns the number of rows read.
+    Each chunk only touches the rollup rows its events fall in.
+    """
+
+    cursor, _ = AnalyticsCursor.objects.get_or_create(name=cursor_name)
+    horizon = timezone.now() - SAFETY_LAG
+    processed = 0
+
+    while True:
+        logs = list(
+            AuditLog.objects.filter(id__gt=cursor.last_audit_id, timestamp__lt=horizon)
+            .select_related("task", "performed_by")
+            .only(
+                "id", "action", "timestamp", "organization_id", "performed_by_id",
+                "task__created_at", "task__urgency", "performed_by__team_id",
+            )
+            .order_by("id")[:chunk_size]
+        )
+
+        if not logs:
+            break
+
+        # Aggregate the chunk in memory first: one delta per rollup row
+        deltas = _new_deltas()
+
+        for log in logs:
+            if log.action not in DECISION_ACTIONS:
+                continue
+
+            _add(
+                deltas, log.action, log.timestamp, log.task.created_at, log.task.urgency,
+                log.organization_id, log.performed_by.team_id if log.performed_by else None,
+                log.performed_by_id,
+            )
+
+        # The cursor moves first: a run that overlaps this one
+        # (cron, --rebuild) and took the chunk already leaves
+        # nothing to apply, so no delta is counted twice
+        with transaction.atomic(using=router.db_for_write(DecisionRollup)):
+            claimed = cursor.advance(logs[-1].id)
+            if claimed:
+                _apply_deltas(deltas)
+
+        if not claimed:
+            cursor = AnalyticsCursor.objects.filter(name=cursor_name).first()
+            if cursor is None:
+                break  # Deleted meanwhile
+            continue
+
+        processed += len(logs)
+
+        if len(logs) < chunk_size:
+            break
+
+    return processed
+
+
+def roll_up_archive(chunk_size=5000):
+    """
+    Folds every archived decision into the rollups and returns
+    the number of rows read. The cursor only follows the live
+    audit log, so this runs once, from rollup_analytics
+    --rebuild; archived rows were all rolled up before they
+    were archived.
+    """
+
+    processed = 0
+    last_id = 0
+
+    while True:
+        logs = list(
+            ArchivedAuditLog.objects.filter(id__gt=last_id, action__in=DECISION_ACTIONS)
+            .select_related("task")
+            .only(
+                "id", "action", "timestamp", "organization_id", "performed_by_id",
+                "task__created_at", "task__urgency",
+            )
+            .order_by("id")[:chunk_size]
+        )
+
+        if not logs:
+            break
+
+        # Users live in the default database; a deleted one
+        # counts as no approver, like the live log's SET_NULL
+        teams = dict(
+            User.objects.filter(id__in={log.performed_by_id for log in logs})
+            .values_list("id", "team_id")
+        )
+
+        deltas = _new_deltas()
+        for log in logs:
+            approver_id = log.performed_by_id if log.performed_by_id in teams else None
+            _add(
+                deltas, log.action, log.timestamp, log.task.created_at, log.task.urgency,
+                log.organization_id, teams.get(approver_id), approver_id,
+            )
+
+        with transaction.atomic(using=router.db_for_write(DecisionRollup)):
+            _apply_deltas(deltas)
+
+        processed += len(logs)
+        last_id = logs[-1].id
+
+        if len(logs) < chunk_size:
+            break
+
+    return processed
+
+
+def _apply_deltas(deltas):
+    if not deltas:
+        return
+
+    existing = {}
+    starts = {key[1] for key in deltas}
+
+    for row in DecisionRollup.objects.filter(bucket_start__in=starts):
+        key = (
+            row.granularity, row.bucket_start, row.organization_id,
+            row.team_id, row.approver_id, row.urgency,
+        )
+        if key in deltas:
+            existing[key] = row
+
+    to_create = []
+    to_update = []
+
+    for key, delta in deltas.items():
+        row = existing.get(key)
+
+        if row is None:
+            granularity, start, organization_id, team_id, approver_id, urgency = key
+            to_create.append(DecisionRollup(
+                granularity=granularity,
+                bucket_start=start,
+                organization_id=organization_id,
+                team_id=team_id,
+                approver_id=approver_id,
+                urgency=urgency,
+                **delta,
+            ))
+            continue
+
+        row.decisions += delta["decisions"]
+        row.approved += delta["approved"]
+        row.rejected += delta["rejected"]
+        row.sla_breaches += delta["sla_breaches"]
+        merge_histograms(row.latency_histogram, delta["latency_histogram"])
+        to_update.append(row)
+
+    DecisionRollup.objects.bulk_create(to_create)
+    DecisionRollup.objects.bulk_update(
+        to_update,
+        ["decisions", "approved", "rejected", "sla_breaches", "latency_histogram"],
+    )
+
+
+# =========================================================
+# REPORTING
+# =========================================================
+
+def report(rollups, group_by):
+    """
+    Merges rollup rows into one summary per team / approver.
+    """
+
+    groups = {}
+
+    for row in rollups:
+        if group_by == "team":
+            label = row.team.name if row.team else "No team"
+        else:
+            label = row.approver.username if row.approver else "Unknown"
+
+        group = groups.setdefault(label, {
+            "label": label, "decisions": 0, "approved": 0, "rejected": 0,
+            "histogram": {}, "breaches": defaultdict(int),
+        })
+        group["decisions"] += row.decisions
+        group["approved"] += row.approved
+        group["rejected"] += row.rejected
+        group["breaches"][row.urgency] += row.sla_breaches
+        merge_histograms(group["histogram"], row.latency_histogram)
+
+    summaries = []
+    for group in sorted(groups.values(), key=lambda g: -g["decisions"]):
+        median = percentile(group["histogram"], 0.5)
+        p95 = percentile(group["histogram"], 0.95)
+        summaries.append({
+            **group,
+            "breaches": dict(group["breaches"]),
+            "median_hours": round(median / 3600, 1) if median else None,
+            "p95_hours": round(p95 / 3600, 1) if p95 else None,
+        })
+
+    return summaries
@@ -0,0 +1,191 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import AnalyticsCursor, ApprovalTask, ArchivedAuditLog, ArchivedTask, AuditLog, WebhookDelivery
+
+
+# =========================================================
+# HOT / COLD SPLIT
+#
+# Finished tasks older than ARCHIVE_AFTER_DAYS move, with
+# their audit rows, into the archive tables, one chunk per
+# transaction. The working tables then only hold pending
+# and recently finished work.
+#
+# Each chunk is copied first and deleted second. The copy
+# ignores rows that already exist, so a chunk interrupted
+# between the two steps is simply moved again on the next
+# run.
+# =========================================================
+
+FINISHED = ("APPROVED", "REJECTED")
+
+
+def archivable(cutoff):
+    """
+    Finished tasks last changed before `cutoff` whose audit rows
+    every log consumer (rollups, webhooks) has already read, and
+    with no webhook delivery still pending (deleting the task
+    would cascade to it before it is sent).
+    """
+
+    tasks = ApprovalTask.objects.filter(status__in=FINISHED, updated_at__lt=cutoff).exclude(
+        Exists(WebhookDelivery.objects.filter(audit_log__task=OuterRef("pk"), status="PENDING"))
+    )
+
+    consumed = AnalyticsCursor.objects.order_by("last_audit_id").values_list("last_audit_id", flat=True).first()
+    if consumed is not None:
+        tasks = tasks.exclude(
+            Exists(AuditLog.objects.filter(task=OuterRef("pk"), id__gt=consumed))
+        )
+
+    return tasks
+
+
+def archive_finished(older_than_days=None, chunk_size=500):
+    """
+    Moves finished tasks out of the working tables.
+    Returns the number of tasks archived.
+    """
+
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = timezone.now() - timedelta(days=days)
+    return _archive(archivable(cutoff), chunk_size)
+
+
+def archive_selected(queryset, chunk_size=500):
+    """
+    Moves the finished tasks among `queryset`, whatever their
+    age (admin action). Returns the number of tasks archived.
+    """
+
+    return _archive(archivable(timezone.now()).filter(id__in=queryset.values("id")), chunk_size)
+
+
+def _archive(candidates, chunk_size):
+    archive_db = router.db_for_write(ArchivedTask)
+    moved = 0
+    last_id = 0
+
+    while True:
+        tasks = list(
+            candidates
+            .filter(id__gt=last_id)
+            .select_related("requester", "approver")
+            .order_by("id")[:chunk_size]
+        )
+
+        if not tasks:
+            break
+
+        logs = list(AuditLog.objects.filter(task__in=tasks).order_by("id"))
+
+        with transaction.atomic(using=archive_db):
+            ArchivedTask.objects.bulk_create(
+                [_archived_task(task) for task in tasks],
+                ignore_conflicts=True,
+            )
+            ArchivedAuditLog.objects.bulk_create(
+                [_archived_log(log) for log in logs],
+                ignore_conflicts=True,
+            )
+
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            # Steps, notifications and webhook deliveries go with them
+            ApprovalTask.objects.filter(
+                id__in=[task.id for task in tasks],
+                status__in=FINISHED,
+            ).delete()
+
+        moved += len(tasks)
+        last_id = tasks[-1].id
+
+        if len(tasks) < chunk_size:
+            break
+
+    return moved
+
+
+def _archived_task(task):
+    return ArchivedTask(
+        id=task.id,
+        organization_id=task.organization_id,
+        title=task.title,
+        description=task.description,
+        urgency=task.urgency,
+        status=task.status,
+        requester_id=task.requester_id,
+        requester_name=task.requester.username,
+        approver_id=task.approver_id,
+        approver_name=task.approver.username,
+        workflow_id=task.workflow_id,
+        stage_plan=task.stage_plan,
+        created_at=task.created_at,
+        finished_at=task.updated_at,
+    )
+
+
+def _archived_log(log):
+    return ArchivedAuditLog(
+        id=log.id,
+        task_id=log.task_id,
+        organization_id=log.organization_id,
+        action=log.action,
+        performed_by_id=log.performed_by_id,
+        performed_by_name=log.performed_by_name,
+        timestamp=log.timestamp,
+        remarks=log.remarks,
+        prev_hash=log.prev_hash,
+        entry_hash=log.entry_hash,
+    )
+
+
+# =========================================================
+# UNIFIED READ API
+# Working tables first; the archive is only read when the
+# caller asks for it.
+# =========================================================
+def find_task(task_id, include_archive=False):
+    """
+    Returns (task, archived) for the current tenant,
+    or (None, False) if there is no such task.
+    """
+
+    task = ApprovalTask.tenant.select_related("requester", "approver").filter(id=task_id).first()
+    if task is not None:
+        return task, False
+
+    if include_archive:
+        task = ArchivedTask.tenant.filter(id=task_id).first()
+        if task is not None:
+            return task, True
+
+    return None, False
+
+
+def timeline(task, archived):
+    if archived:
+        return ArchivedAuditLog.tenant.filter(task_id=task.id).order_by("timestamp")
+    return AuditLog.tenant.filter(task=task).select_related("performed_by").order_by("timestamp")
+
+
+def search_tasks(user, query, include_archive=False, limit=50):
+    """
+    The user's own tasks (requested or to approve) by title,
+    newest first: [(task, archived)].
+    """
+
+    mine = Q(requester_id=user.pk) | Q(approver_id=user.pk)
+
+    hot = ApprovalTask.tenant.filter(mine, title__icontains=query).order_by("-created_at")
+    results = [(task, False) for task in hot[:limit]]
+
+    if include_archive and len(results) < limit:
+        cold = ArchivedTask.tenant.filter(mine, title__icontains=query).order_by("-created_at")
+        results += [(task, True) for task in cold[:limit - len(results)]]
+
+    return results
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose get_user() (run once per request for the
+    session's user) is served from the cache.
+    The cached user already has organization and team attached,
+    so the views' role / organization / team checks cost no query.
+    Entries are deleted when the user, their organization or their
+    team is saved or deleted (core.signals). They also expire after
+    AUTH_USER_CACHE_SECONDS, which is short: other processes only
+    see those deletions through a shared cache (REDIS_URL), and
+    queryset .update() calls send no signal at all.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+
+        if user is None:
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.select_related(
+                    "organization", "team"
+                ).get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+
+            cache.set(key, user, settings.AUTH_USER_CACHE_SECONDS)
+
+        return user if self.user_can_authenticate(user) else None
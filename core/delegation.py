@@ -0,0 +1,175 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ApprovalTask, DelegationRule
+
+
+logger = logging.getLogger(__name__)
+
+
+# =========================================================
+# EFFECTIVE APPROVER MAP
+#
+# All active rules of an organization are resolved at once
+# into {(approver, urgency, team): final delegate}, chains
+# followed and cycles cut. Routing a task is then one dict
+# lookup. The map is cached until the next rule starts or
+# ends, and dropped whenever a rule changes (core.signals).
+#
+# Other processes only see that drop through a shared cache;
+# without one the map is kept for seconds, and the reminder
+# job confirms every reassignment against the rules first.
+# =========================================================
+
+URGENCIES = [value for value, _ in ApprovalTask.URGENCY_CHOICES]
+
+# Upper bound, so a missed invalidation heals by itself
+MAP_TIMEOUT = 60 * 60 if settings.SHARED_CACHE else 10
+
+
+def _cache_key(organization_id):
+    return f"delegation:{organization_id}"
+
+
+def clear_delegation_map(organization_id):
+    cache.delete(_cache_key(organization_id))
+
+
+class DelegationMap:
+
+    def __init__(self, routes, teams, valid_until):
+        self.routes = routes
+        # Teams some rule is scoped to; any other team behaves like None
+        self.teams = teams
+        self.valid_until = valid_until
+
+    def resolve(self, approver_id, urgency, team_id):
+        """
+        Who acts for `approver_id` on a request of this urgency
+        from this team (the approver themselves if nobody).
+        """
+
+        team_id = team_id if team_id in self.teams else None
+        return self.routes.get((approver_id, urgency, team_id), approver_id)
+
+    def for_task(self, task):
+        return self.resolve(task.approver_id, task.urgency, task.requester.team_id)
+
+    def delegated_to(self, user_id):
+        """
+        Filter for the single-approver tasks routed to this user
+        by someone else's rules (None if there are none).
+        """
+
+        urgencies = defaultdict(list)
+        for (approver_id, urgency, team_id), delegate_id in self.routes.items():
+            if delegate_id == user_id:
+                urgencies[(approver_id, team_id)].append(urgency)
+
+        condition = None
+        for (approver_id, team_id), values in urgencies.items():
+            if team_id is not None:
+                team = Q(requester__team_id=team_id)
+            else:
+                team = ~Q(requester__team_id__in=self.teams) | Q(requester__team__isnull=True)
+
+            part = Q(approver_id=approver_id, urgency__in=values, stage_plan=[]) & team
+            condition = part if condition is None else condition | part
+
+        return condition
+
+
+def build_map(organization_id, now=None):
+    now = now or timezone.now()
+
+    rules = list(
+        DelegationRule.objects.filter(
+            organization_id=organization_id,
+            is_active=True,
+            ends_at__gt=now,
+        )
+    )
+
+    active = [rule for rule in rules if rule.starts_at <= now]
+
+    # The map holds until the next rule starts or an active one ends
+    boundaries = [rule.starts_at for rule in rules if rule.starts_at > now]
+    boundaries += [rule.ends_at for rule in active]
+    valid_until = min(boundaries, default=now + timedelta(seconds=MAP_TIMEOUT))
+
+    # Most specific rule first, then the newest
+    active.sort(key=lambda rule: (not rule.urgency, rule.team_id is None, -rule.created_at.timestamp()))
+
+    direct = defaultdict(list)
+    for rule in active:
+        direct[rule.delegator_id].append(rule)
+
+    def next_hop(user_id, urgency, team_id):
+        for rule in direct.get(user_id, ()):
+            if rule.urgency in ("", urgency) and rule.team_id in (None, team_id):
+                return rule.delegate_id
+        return None
+
+    teams = {rule.team_id for rule in active if rule.team_id}
+    routes = {}
+
+    for approver_id in direct:
+        for urgency in URGENCIES:
+            for team_id in teams | {None}:
+                current = approver_id
+                chain = [approver_id]
+
+                while (hop := next_hop(current, urgency, team_id)) is not None:
+                    if hop in chain:
+                        # A -> B -> ... -> A: nobody is left to act,
+                        # so the task stays with its approver
+                        logger.warning("Delegation cycle ignored: %s", chain + [hop])
+                        current = approver_id
+                        break
+                    chain.append(hop)
+                    current = hop
+
+                if current != approver_id:
+                    routes[(approver_id, urgency, team_id)] = current
+
+    return DelegationMap(routes, teams, valid_until)
+
+
+def delegation_map(organization_id):
+    """
+    The organization's current map: one cache read.
+    """
+
+    now = timezone.now()
+    key = _cache_key(organization_id)
+
+    current = cache.get(key)
+    if current is not None and current.valid_until > now:
+        return current
+
+    current = build_map(organization_id, now)
+    timeout = min(MAP_TIMEOUT, max(1, int((current.valid_until - now).total_seconds())))
+    cache.set(key, current, timeout)
+
+    return current
+
+
+def confirmed_delegate(task, fresh_maps):
+    """
+    Who acts for the task's approver according to the rules as
+    they are now (not a cached map): checked before a task that
+    is already assigned is handed over. `fresh_maps` holds the
+    maps built so far in this batch ({organization id: map}),
+    so each organization's is built once per batch.
+    """
+
+    current = fresh_maps.get(task.organization_id)
+    if current is None:
+        current = fresh_maps[task.organization_id] = build_map(task.organization_id)
+    return current.for_task(task)
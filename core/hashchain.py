@@ -0,0 +1,96 @@
+import datetime
+import hashlib
+
+
+# =========================================================
+# AUDIT HASH CHAIN
+#
+# Every audit row stores the hash of the previous row of the
+# same task (prev_hash) and its own hash over that link plus
+# its content (entry_hash). Editing, deleting or reordering a
+# row breaks the chain from that row on.
+#
+# The actor is hashed by the username captured at write time,
+# not the user id: deleting a user (performed_by SET_NULL)
+# must not look like tampering.
+#
+# Kept free of model imports: migrations and the verification
+# workers use it on plain tuples.
+# =========================================================
+
+GENESIS = ""
+
+# Columns, in this order, that verify_rows() expects
+FIELDS = (
+    "id", "task_id", "organization_id", "action", "performed_by_name",
+    "timestamp", "remarks", "prev_hash", "entry_hash",
+)
+
+
+def _timestamp(value):
+    return value.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def chain_hash(prev_hash, task_id, organization_id, action, performed_by_name, timestamp, remarks):
+    # Only the last field is free text, so the separator
+    # cannot make two different rows hash alike
+    payload = "\x1f".join((
+        prev_hash,
+        str(task_id),
+        "" if organization_id is None else str(organization_id),
+        action,
+        performed_by_name,
+        _timestamp(timestamp),
+        remarks,
+    ))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def seal(entry, prev_hash):
+    """
+    Links an unsaved audit row (AuditLog or ArchivedAuditLog)
+    to `prev_hash` and returns its own hash.
+    """
+
+    entry.prev_hash = prev_hash
+    entry.entry_hash = chain_hash(
+        prev_hash, entry.task_id, entry.organization_id, entry.action,
+        entry.performed_by_name, entry.timestamp, entry.remarks,
+    )
+    return entry.entry_hash
+
+
+def verify_rows(rows):
+    """
+    Checks FIELDS tuples ordered by (task_id, id).
+    Returns (rows checked, [(log id, task id, reason)]),
+    at most one break per task.
+    """
+
+    checked = 0
+    broken = []
+    task = head = broken_task = None
+
+    for log_id, task_id, organization_id, action, performed_by_name, timestamp, remarks, prev_hash, entry_hash in rows:
+        checked += 1
+
+        if task_id != task:
+            task, head = task_id, GENESIS
+
+        if task_id == broken_task:
+            head = entry_hash
+            continue
+
+        if prev_hash != head:
+            reason = "link to the previous entry does not match (entry removed, inserted or reordered)"
+        elif chain_hash(prev_hash, task_id, organization_id, action, performed_by_name, timestamp, remarks) != entry_hash:
+            reason = "content does not match its hash (entry edited)"
+        else:
+            head = entry_hash
+            continue
+
+        broken.append((log_id, task_id, reason))
+        broken_task = task_id
+        head = entry_hash
+
+    return checked, broken
@@ -0,0 +1,207 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils import timezone
+
+from .models import IdempotencyRecord
+
+
+# =========================================================
+# IDEMPOTENCY KEYS
+#
+# A retry that carries the same Idempotency-Key gets the
+# original response back; the view does not run again.
+#
+# The claim takes no lock: the first request wins an atomic
+# insert (cache.add, then the unique (user, key) row) and
+# every concurrent duplicate loses it and is told to retry.
+# =========================================================
+
+IN_PROGRESS = "in-progress"
+
+# Nothing to protect: these render pages, they change nothing
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# A claim left behind by a crashed worker expires this fast
+CLAIM_TIMEOUT = 60
+
+
+def _cache_key(user_id, key):
+    return f"idem:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(stored):
+    response = HttpResponse(
+        bytes(stored["body"]),
+        status=stored["status_code"],
+        content_type=stored["content_type"] or None,
+    )
+    if stored["location"]:
+        response["Location"] = stored["location"]
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _in_progress():
+    response = HttpResponse("A request with this Idempotency-Key is still in progress.", status=409)
+    response["Retry-After"] = "1"
+    return response
+
+
+def _mismatch():
+    return HttpResponse(
+        "This Idempotency-Key was already used for a different request.",
+        status=422,
+    )
+
+
+def _answer(stored, fingerprint):
+    """
+    Response for a request that lost the claim.
+    """
+    if stored["fingerprint"] != fingerprint:
+        return _mismatch()
+    if stored["status_code"] is None:
+        return _in_progress()
+    return _replay(stored)
+
+
+def _claim_row(request, key, fingerprint):
+    """
+    Inserts the (user, key) row. Returns None when this request
+    owns the key, else the stored state of whoever does.
+    """
+
+    ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+    for _ in range(2):
+        try:
+            with transaction.atomic(using=router.db_for_write(IdempotencyRecord)):
+                IdempotencyRecord.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+            return None
+        except IntegrityError:
+            record = IdempotencyRecord.objects.filter(user=request.user, key=key).first()
+
+        if record is None:
+            continue  # Released in between: try again
+
+        stale_claim = record.status_code is None and record.created_at < timezone.now() - timedelta(seconds=CLAIM_TIMEOUT)
+        if record.created_at < timezone.now() - ttl or stale_claim:
+            # Expired key (or abandoned claim): start over
+            IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            continue
+
+        return {
+            "fingerprint": record.fingerprint,
+            "status_code": record.status_code,
+            "content_type": record.content_type,
+            "location": record.location,
+            "body": record.body,
+        }
+
+    return {"fingerprint": fingerprint, "status_code": None}
+
+
+def idempotent(view_func):
+    """
+    Honors the Idempotency-Key header on a mutating view.
+    Keys are scoped per user and kept for IDEMPOTENCY_KEY_TTL.
+    Only final answers are stored: on a 5xx (or an exception)
+    the key is released so the client can retry for real.
+    The view's writes and the stored answer commit together.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+
+        if not key or request.method in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+
+        if len(key) > 255:
+            return HttpResponseBadRequest("Idempotency-Key is too long")
+
+        cache_key = _cache_key(request.user.pk, key)
+        fingerprint = _fingerprint(request)
+
+        # Hot path: a retry of a finished request is one cache read
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _answer(stored, fingerprint)
+
+        # Claim in the cache first (atomic add), then in the
+        # database, which is shared by every worker and survives
+        # cache evictions and restarts.
+        claim = {"fingerprint": fingerprint, "status_code": None}
+        if not cache.add(cache_key, claim, CLAIM_TIMEOUT):
+            return _answer(cache.get(cache_key) or claim, fingerprint)
+
+        stored = _claim_row(request, key, fingerprint)
+        if stored is not None:
+            if stored["status_code"] is None:
+                cache.delete(cache_key)
+            else:
+                cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+            return _answer(stored, fingerprint)
+
+        # One transaction: a crash after the view's writes but
+        # before the answer is stored rolls both back, so the
+        # retry (once the claim expires) cannot apply them twice
+        stored = None
+        try:
+            with transaction.atomic(using=router.db_for_write(IdempotencyRecord)):
+                response = view_func(request, *args, **kwargs)
+
+                if response.status_code < 500 and not getattr(response, "streaming", False):
+                    stored = {
+                        "fingerprint": fingerprint,
+                        "status_code": response.status_code,
+                        "content_type": response.get("Content-Type", ""),
+                        "location": response.get("Location", ""),
+                        "body": response.content,
+                    }
+                    IdempotencyRecord.objects.filter(user=request.user, key=key).update(
+                        status_code=stored["status_code"],
+                        content_type=stored["content_type"],
+                        location=stored["location"],
+                        body=stored["body"],
+                    )
+        except Exception:
+            _release(request, key, cache_key)
+            raise
+
+        if stored is None:
+            _release(request, key, cache_key)
+            return response
+
+        cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+
+        return response
+
+    return wrapper
+
+
+def _release(request, key, cache_key):
+    IdempotencyRecord.objects.filter(user=request.user, key=key).delete()
+    cache.delete(cache_key)
+
+
+def purge_expired():
+    """
+    Deletes keys older than the TTL. Returns the number deleted.
+    """
+
+    cutoff = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import router
+
+from core.archive import archive_finished
+from core.models import ArchivedTask
+from core.tenancy import each_database
+
+
+class Command(BaseCommand):
+    help = "Moves finished approvals (and their audit trail) into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help="Only tasks finished at least this long ago",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        # A tenant with its own database archives into it
+        for organization_id in each_database():
+            moved = archive_finished(
+                older_than_days=options["older_than_days"],
+                chunk_size=options["chunk_size"],
+            )
+
+            self.stdout.write(self.style.SUCCESS(
+                f"[ARCHIVE] {moved} tasks moved to {router.db_for_write(ArchivedTask)}"
+            ))
@@ -0,0 +1,120 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from core.models import ApprovalTask, User
+from core.tenancy import use_tenant
+from core.views import dashboard
+
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+NO_FRAGMENT_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmarks dashboard render time with and without fragment / template caching"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        # Everything is seeded inside a transaction that is
+        # rolled back, so the benchmark leaves no data behind.
+        try:
+            with transaction.atomic():
+                approver = self.seed(rows)
+                self.run_matrix(approver, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    # =====================================================
+    # SEED DATA
+    # =====================================================
+    def seed(self, rows):
+        requester = User.objects.create(username="bench-requester", role="EMPLOYEE")
+        approver = User.objects.create(username="bench-approver", role="MANAGER")
+
+        ApprovalTask.objects.bulk_create(
+            [
+                ApprovalTask(
+                    title=f"Benchmark approval #{i}",
+                    requester=requester,
+                    approver=approver,
+                    urgency=("LOW", "MEDIUM", "HIGH", "CRITICAL")[i % 4],
+                )
+                for i in range(rows)
+            ],
+            batch_size=1000,
+        )
+
+        self.stdout.write(f"Seeded {rows} pending tasks")
+        return approver
+
+    # =====================================================
+    # MEASUREMENT
+    # =====================================================
+    def run_matrix(self, approver, repeat):
+        cached_templates = settings.TEMPLATES
+        uncached_templates = [
+            {**cached_templates[0], 'APP_DIRS': False, 'OPTIONS': {
+                **cached_templates[0]['OPTIONS'], 'loaders': UNCACHED_LOADERS,
+            }},
+        ]
+
+        scenarios = [
+            ("uncached loader, no fragment cache", uncached_templates, NO_FRAGMENT_CACHE),
+            ("cached loader,   no fragment cache", cached_templates, NO_FRAGMENT_CACHE),
+            ("cached loader,   warm fragment cache", cached_templates, settings.CACHES),
+        ]
+
+        for label, templates, caches in scenarios:
+            with override_settings(TEMPLATES=templates, CACHES=caches):
+                cache.clear()
+                self.render(approver)  # warm-up (fills caches)
+
+                best = min(self.render(approver) for _ in range(repeat))
+
+            self.stdout.write(f"{label}: {best * 1000:8.1f} ms")
+
+        # One task changes: the table key misses, but every
+        # other row is still served from its own fragment.
+        with override_settings(CACHES=settings.CACHES):
+            cache.clear()
+            self.render(approver)
+
+            task = approver.assigned_approvals.first()
+            task.save(update_fields=["updated_at"])
+            best = self.render(approver)
+
+        self.stdout.write(f"cached loader,   one row changed     : {best * 1000:8.1f} ms")
+
+    def render(self, approver):
+        request = RequestFactory().get("/dashboard/")
+        request.user = approver
+
+        started = time.perf_counter()
+        with use_tenant(approver.organization_id):
+            response = dashboard(request)
+        elapsed = time.perf_counter() - started
+
+        assert response.status_code == 200
+        return elapsed
@@ -0,0 +1,136 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+SCHEMA = """
+CREATE TABLE task (
+    id INTEGER PRIMARY KEY,
+    approver_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX task_approver_status ON task (approver_id, status);
+CREATE TABLE audit (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+"""
+
+
+class Command(BaseCommand):
+    help = "Measures concurrent SQLite read/write throughput: default vs performance profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--tasks", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        for profile in ("default", "performance"):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.sqlite3")
+                self.seed(path, options["tasks"])
+                reads, writes, errors = self.run(path, profile, options)
+
+            seconds = options["seconds"]
+            self.stdout.write(
+                f"{profile:<12} reads/s={reads / seconds:9.0f}  "
+                f"writes/s={writes / seconds:7.0f}  locked errors={errors}"
+            )
+
+    # =====================================================
+    # SETUP
+    # =====================================================
+    def seed(self, path, tasks):
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        now = time.time()
+        conn.executemany(
+            "INSERT INTO task (approver_id, status, updated_at) VALUES (?, 'PENDING', ?)",
+            ((i % 50, now) for i in range(tasks)),
+        )
+        conn.commit()
+        conn.close()
+
+    def connect(self, path, profile):
+        if profile == "default":
+            # What Django opens without DB_SQLITE_PROFILE.
+            return sqlite3.connect(path, timeout=5, isolation_level=None)
+
+        conn = sqlite3.connect(path, timeout=20, isolation_level=None)
+        for pragma in settings.SQLITE_PERFORMANCE_PRAGMAS.split(";"):
+            if pragma.strip():
+                conn.execute(pragma)
+        return conn
+
+    # =====================================================
+    # WORKLOAD
+    # =====================================================
+    def run(self, path, profile, options):
+        deadline = time.monotonic() + options["seconds"]
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        begin = "BEGIN" if profile == "default" else "BEGIN IMMEDIATE"
+
+        def bump(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            conn = self.connect(path, profile)
+            while time.monotonic() < deadline:
+                try:
+                    # Dashboard-like read: a count plus a page of rows.
+                    approver = random.randrange(50)
+                    conn.execute(
+                        "SELECT COUNT(*) FROM task WHERE approver_id = ? AND status = 'PENDING'",
+                        (approver,),
+                    ).fetchone()
+                    conn.execute(
+                        "SELECT id, updated_at FROM task WHERE approver_id = ? AND status = 'PENDING' LIMIT 50",
+                        (approver,),
+                    ).fetchall()
+                    bump("reads")
+                except sqlite3.OperationalError:
+                    bump("errors")
+            conn.close()
+
+        def writer():
+            conn = self.connect(path, profile)
+            while time.monotonic() < deadline:
+                try:
+                    # Decision-like write: update a task and append an audit row.
+                    task_id = random.randrange(1, options["tasks"] + 1)
+                    conn.execute(begin)
+                    conn.execute("UPDATE task SET updated_at = ? WHERE id = ?", (time.time(), task_id))
+                    conn.execute(
+                        "INSERT INTO audit (task_id, action, timestamp) VALUES (?, 'REMINDER', ?)",
+                        (task_id, time.time()),
+                    )
+                    conn.execute("COMMIT")
+                    bump("writes")
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    bump("errors")
+            conn.close()
+
+        threads = [threading.Thread(target=reader) for _ in range(options["readers"])]
+        threads += [threading.Thread(target=writer) for _ in range(options["writers"])]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return counts["reads"], counts["writes"], counts["errors"]
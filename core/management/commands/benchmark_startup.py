@@ -0,0 +1,92 @@
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+PROFILES = {
+    "cold (no preload, no warmup)": {"GUNICORN_PRELOAD": "0", "GUNICORN_WARMUP": "0"},
+    "preload + warmup": {"GUNICORN_PRELOAD": "1", "GUNICORN_WARMUP": "1"},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = "Benchmarks gunicorn startup time and first-request latency per config profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/login/", help="URL requested")
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--worker-class", default="sync")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--requests", type=int, default=20, help="Warm requests after the first")
+
+    def handle(self, *args, **options):
+        for label, overrides in PROFILES.items():
+            runs = [self.run_once(overrides, options) for _ in range(options["repeat"])]
+
+            ready, first, warm = (statistics.median(values) for values in zip(*runs))
+            self.stdout.write(
+                f"{label:32} first response after start {ready:7.0f} ms   "
+                f"first request {first:6.1f} ms   warm median {warm:5.1f} ms"
+            )
+
+    # =====================================================
+    def run_once(self, overrides, options):
+        port = free_port()
+        url = f"http://127.0.0.1:{port}{options['path']}"
+
+        env = {
+            **os.environ,
+            **overrides,
+            "PORT": str(port),
+            "GUNICORN_WORKERS": str(options["workers"]),
+            "GUNICORN_WORKER_CLASS": options["worker_class"],
+        }
+
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "approval_system/gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            # Wait for the socket, then time the very first request
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    if server.poll() is not None:
+                        raise RuntimeError("gunicorn exited during startup")
+                    time.sleep(0.005)
+
+            first = self.timed_get(url)
+            ready = (time.perf_counter() - started) * 1000
+
+            warm = statistics.median(self.timed_get(url) for _ in range(options["requests"]))
+        finally:
+            server.terminate()
+            server.wait()
+
+        return ready, first, warm
+
+    def timed_get(self, url):
+        started = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,375 @@
+import asyncio
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from core.models import Organization, User
+
+
+LOAD_DOMAIN = "loadtest.local"
+PASSWORD = "loadtest-password"
+
+ASSIGNED_RE = re.compile(rb'formaction="/approve/(\d+)/"')
+AUDIT_RE = re.compile(rb'href="/audit/(\d+)/"')
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# =========================================================
+# ASYNC HTTP CLIENT
+# Minimal HTTP/1.1 over asyncio streams: one keep-alive
+# connection and one cookie jar per simulated user.
+# =========================================================
+class Client:
+
+    def __init__(self, base_url, stats):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.stats = stats
+        self.cookies = {}
+        self.reader = self.writer = None
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            self.reader = self.writer = None
+
+    async def request(self, route, method, path, form=None):
+        """
+        Returns (status, body); the timing goes into the stats.
+        """
+
+        started = time.perf_counter()
+        try:
+            status, body = await self._send(method, path, form)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as error:
+            await self.close()
+            self.stats.record(route, started, None, error=type(error).__name__)
+            return None, b""
+
+        self.stats.record(route, started, status)
+        return status, body
+
+    async def _send(self, method, path, form):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        body = urlencode(form).encode() if form is not None else b""
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Content-Length: {len(body)}",
+        ]
+        if form is not None:
+            headers.append("Content-Type: application/x-www-form-urlencoded")
+        if self.cookies:
+            headers.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        if "csrftoken" in self.cookies:
+            headers.append(f"X-CSRFToken: {self.cookies['csrftoken']}")
+
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("server closed the connection")
+        status = int(status_line.split()[1])
+
+        length = None
+        chunked = close = False
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name, value = name.lower(), value.strip()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value.lower():
+                chunked = True
+            elif name == "connection" and value.lower() == "close":
+                close = True
+            elif name == "set-cookie":
+                cookie, _, _ = value.partition(";")
+                key, _, val = cookie.partition("=")
+                self.cookies[key.strip()] = val.strip()
+
+        if chunked:
+            parts = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                if not size:
+                    await self.reader.readline()
+                    break
+                parts.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            body = b"".join(parts)
+        elif length is not None:
+            body = await self.reader.readexactly(length)
+        else:
+            body = await self.reader.read()
+            close = True
+
+        if close:
+            await self.close()
+
+        return status, body
+
+
+# =========================================================
+# STATS
+# =========================================================
+class Stats:
+
+    def __init__(self):
+        self.samples = defaultdict(list)     # route -> [(start, latency ms)]
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.reminder_passes = []            # [(start, end)]
+
+    def record(self, route, started, status, error=None):
+        self.samples[route].append((started, (time.perf_counter() - started) * 1000))
+        self.statuses[route][error or status] += 1
+
+    def during_reminders(self, started):
+        return any(start <= started <= end for start, end in self.reminder_passes)
+
+
+# =========================================================
+# SIMULATED USERS
+# =========================================================
+async def login(client, username):
+    await client.request("login", "GET", "/login/")
+    status, _ = await client.request(
+        "login", "POST", "/login/",
+        {"username": username, "password": PASSWORD},
+    )
+    return status == 302
+
+
+async def employee(client, username, approver_ids, deadline, think):
+    if not await login(client, username):
+        return
+
+    while time.perf_counter() < deadline:
+        roll = random.random()
+
+        if roll < 0.5:
+            await client.request("dashboard", "GET", "/dashboard/")
+        elif roll < 0.8:
+            await client.request("create_approval", "GET", "/create/")
+            await client.request("create_approval", "POST", "/create/", {
+                "title": f"Load test request {random.randrange(10 ** 6)}",
+                "urgency": random.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"]),
+                "approver": random.choice(approver_ids),
+            })
+        else:
+            _, body = await client.request("dashboard", "GET", "/dashboard/")
+            task_ids = AUDIT_RE.findall(body)
+            if task_ids:
+                await client.request("audit", "GET", f"/audit/{int(random.choice(task_ids))}/")
+
+        await asyncio.sleep(think * random.uniform(0.5, 1.5))
+
+
+async def manager(client, username, deadline, think):
+    if not await login(client, username):
+        return
+
+    while time.perf_counter() < deadline:
+        _, body = await client.request("dashboard", "GET", "/dashboard/")
+        task_ids = ASSIGNED_RE.findall(body)
+
+        if task_ids:
+            task_id = int(random.choice(task_ids))
+            roll = random.random()
+
+            if roll < 0.5:
+                await client.request("approve", "POST", f"/approve/{task_id}/", {"comment": "ok"})
+            elif roll < 0.7:
+                await client.request("reject", "POST", f"/reject/{task_id}/", {"comment": "no"})
+            elif roll < 0.8:
+                await client.request("snooze", "GET", f"/snooze/{task_id}/1/")
+            else:
+                await client.request("audit", "GET", f"/audit/{task_id}/")
+
+        await asyncio.sleep(think * random.uniform(0.5, 1.5))
+
+
+async def reminder_passes(stats, deadline, env, organization_id):
+    """
+    Runs the reminder job back to back, on the load-test
+    organization only, to measure how much it slows the
+    web routes down.
+    """
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "manage.py", "send_approval_reminders",
+            "--organization", str(organization_id),
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await process.wait()
+        stats.reminder_passes.append((started, time.perf_counter()))
+        await asyncio.sleep(1)
+
+
+class Command(BaseCommand):
+    help = "Load test: simulated employees and managers drive the real routes over HTTP"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Existing server (default: start gunicorn locally)")
+        parser.add_argument("--employees", type=int, default=20)
+        parser.add_argument("--managers", type=int, default=5)
+        parser.add_argument("--duration", type=float, default=30, help="Seconds")
+        parser.add_argument("--think-ms", type=float, default=200, help="Mean pause between actions")
+        parser.add_argument("--workers", type=int, default=4, help="Gunicorn workers when started locally")
+        parser.add_argument("--with-reminders", action="store_true", help="Run reminder passes concurrently")
+        parser.add_argument("--keep-data", action="store_true", help="Keep the seeded organization")
+
+    def handle(self, *args, **options):
+        employees, managers = self.seed(options["employees"], options["managers"])
+
+        # Everything spawned sends mail to memory, never the network
+        env = {**os.environ, "EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend"}
+
+        server = None
+        base_url = options["url"]
+        if not base_url:
+            server, base_url = self.start_server(env, options["workers"])
+
+        stats = Stats()
+        started = time.perf_counter()
+
+        try:
+            asyncio.run(self.run(base_url, employees, managers, stats, env, options))
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+            if not options["keep_data"]:
+                Organization.objects.filter(domain=LOAD_DOMAIN).delete()
+
+        self.report(stats, time.perf_counter() - started)
+
+    # =====================================================
+    def seed(self, employees, managers):
+        Organization.objects.filter(domain=LOAD_DOMAIN).delete()
+        organization = self.organization = Organization.objects.create(name="Load test", domain=LOAD_DOMAIN)
+
+        # One hash for everyone: hashing is deliberately slow
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            [
+                User(username=f"load-emp-{i}", role="EMPLOYEE", organization=organization, password=password)
+                for i in range(employees)
+            ] + [
+                User(username=f"load-mgr-{i}", role="MANAGER", organization=organization, password=password)
+                for i in range(managers)
+            ]
+        )
+
+        return users[:employees], users[employees:]
+
+    def start_server(self, env, workers):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "approval_system/gunicorn.conf.py",
+             "--bind", f"127.0.0.1:{port}", "--workers", str(workers)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("gunicorn exited during startup")
+                time.sleep(0.05)
+
+        return server, f"http://127.0.0.1:{port}"
+
+    async def run(self, base_url, employees, managers, stats, env, options):
+        deadline = time.perf_counter() + options["duration"]
+        think = options["think_ms"] / 1000
+        approver_ids = [user.id for user in managers]
+
+        clients = [Client(base_url, stats) for _ in employees + managers]
+        jobs = [
+            employee(client, user.username, approver_ids, deadline, think)
+            for client, user in zip(clients, employees)
+        ] + [
+            manager(client, user.username, deadline, think)
+            for client, user in zip(clients[len(employees):], managers)
+        ]
+
+        if options["with_reminders"]:
+            jobs.append(reminder_passes(stats, deadline, env, self.organization.id))
+
+        try:
+            await asyncio.gather(*jobs)
+        finally:
+            for client in clients:
+                await client.close()
+
+    # =====================================================
+    def report(self, stats, elapsed):
+        self.stdout.write(
+            f"\n{'route':16} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'errors':>7} {'409':>5}"
+        )
+
+        for route in sorted(stats.samples):
+            latencies = [latency for _, latency in stats.samples[route]]
+            statuses = stats.statuses[route]
+            errors = sum(
+                count for status, count in statuses.items()
+                if not isinstance(status, int) or (status >= 400 and status != 409)
+            )
+
+            self.stdout.write(
+                f"{route:16} {len(latencies):8} {len(latencies) / elapsed:7.1f} "
+                f"{percentile(latencies, 0.5):8.1f} {percentile(latencies, 0.95):8.1f} "
+                f"{percentile(latencies, 0.99):8.1f} {errors:7} {statuses.get(409, 0):5}"
+            )
+
+        if not stats.reminder_passes:
+            return
+
+        during, outside = [], []
+        for samples in stats.samples.values():
+            for started, latency in samples:
+                (during if stats.during_reminders(started) else outside).append(latency)
+
+        passes = [(end - start) * 1000 for start, end in stats.reminder_passes]
+        self.stdout.write(
+            f"\nReminder passes: {len(passes)}, median {percentile(passes, 0.5):.0f} ms\n"
+            f"p95 latency during passes {percentile(during, 0.95):.1f} ms "
+            f"({len(during)} requests), outside {percentile(outside, 0.95):.1f} ms"
+        )
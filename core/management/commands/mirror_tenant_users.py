@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Holiday, Organization, Team, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Copies each organization with its own database (TENANT_DATABASES) into it: "
+        "the organization, its holidays, teams and users (run after user changes, e.g. from cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization",
+            type=int,
+            help="Only this organization (id)",
+        )
+
+    def handle(self, *args, **options):
+        tenants = settings.TENANT_DATABASES
+
+        if options["organization"] is not None:
+            if options["organization"] not in tenants:
+                raise CommandError(f"Organization {options['organization']} has no database of its own")
+            tenants = {options["organization"]: tenants[options["organization"]]}
+
+        for organization_id, database in tenants.items():
+            self.mirror(organization_id, database)
+
+    def mirror(self, organization_id, database):
+        """
+        Rows keep their ids, so tasks and audit rows written in the
+        tenant database point at the same users as sessions in
+        "default". Users that left the organization are deactivated
+        there, not deleted: their tasks and audit rows stay.
+        """
+
+        organization = Organization.objects.using("default").get(pk=organization_id)
+        holidays = list(Holiday.objects.using("default").filter(organization_id=organization_id))
+        teams = list(Team.objects.using("default").filter(organization_id=organization_id))
+        users = list(User.objects.using("default").filter(organization_id=organization_id))
+
+        with transaction.atomic(using=database):
+            self.upsert(Organization, [organization], database)
+            self.upsert(Team, teams, database)
+            self.upsert(User, users, database)
+
+            Holiday.objects.using(database).filter(organization_id=organization_id).delete()
+            Holiday.objects.using(database).bulk_create(holidays)
+
+            left = (
+                User.objects.using(database)
+                .filter(organization_id=organization_id, is_active=True)
+                .exclude(id__in=[user.id for user in users])
+                .update(is_active=False)
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[MIRROR] Organization {organization_id} → {database}: "
+            f"{len(users)} users, {len(teams)} teams, {len(holidays)} holidays ({left} deactivated)"
+        ))
+
+    def upsert(self, model, rows, database):
+        fields = [
+            field.name for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        model.objects.using(database).bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=fields,
+        )
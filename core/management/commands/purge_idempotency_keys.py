@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotency import purge_expired
+from core.tenancy import each_database
+
+
+class Command(BaseCommand):
+    help = "Deletes Idempotency-Key records older than IDEMPOTENCY_KEY_TTL (run from cron)"
+
+    def handle(self, *args, **options):
+        # Requests of a tenant with its own database keep their keys there
+        deleted = sum(purge_expired() for organization_id in each_database())
+        self.stdout.write(self.style.SUCCESS(f"[IDEMPOTENCY] {deleted} expired keys deleted"))
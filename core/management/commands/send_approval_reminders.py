@@ -1,76 +1,283 @@
+import heapq
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import router, transaction
+from django.db.models import Exists, Max, OuterRef, Prefetch, Q
 from django.utils import timezone
-from datetime import timedelta
 
-from core.models import ApprovalTask, AuditLog, User
-from core.utils import send_notification_email
+from core.delegation import confirmed_delegate, delegation_map
+from core.models import ApprovalStep, ApprovalTask, AuditLog, TaskConflict, User
+from core.sla import calendar_for
+from core.tenancy import each_database, use_tenant
+from core.notifications import batched, notify
 
 
 class Command(BaseCommand):
     help = "Automated reminder and escalation engine for approvals"
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Pending tasks handled per (short) transaction",
+        )
+        parser.add_argument(
+            "--organization",
+            type=int,
+            help="Only this organization's tasks (id)",
+        )
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Keep running and fire reminders as they fall due (instead of cron)",
+        )
+        parser.add_argument(
+            "--poll-seconds",
+            type=float,
+            default=15,
+            help="Daemon: how often to pick up new / changed tasks",
+        )
+        parser.add_argument(
+            "--state-file",
+            default=str(settings.REMINDER_DAEMON_STATE_FILE),
+            help="Daemon: checkpoint of the schedule for fast restarts",
+        )
+
+    def handle(self, *args, **options):
+        self.organization_id = options["organization"]
+
+        if self.organization_id in settings.TENANT_DATABASES:
+            # That organization's own database
+            with use_tenant(self.organization_id):
+                return self.run(options)
+
+        if options["daemon"] or self.organization_id is not None:
+            # The shared database only; a tenant with its own
+            # database gets its own daemon (--organization)
+            return self.run(options)
+
+        for organization_id in each_database():
+            self.run(options)
+
+    def run(self, options):
+        if options["daemon"]:
+            return self.run_daemon(options)
+
         now = timezone.now()
+        chunk_size = options["chunk_size"]
 
-        # STEP 1: Get all pending approvals
-        pending_tasks = ApprovalTask.objects.filter(status="PENDING")
+        # STEP 1: Walk the pending approvals in id order, one chunk
+        # per transaction, so the web app is never locked out for
+        # the whole run (and emails go out after each commit).
+        last_id = 0
 
-        for task in pending_tasks:
+        while True:
+            with transaction.atomic(using=router.db_for_write(ApprovalTask)), batched():
+                chunk = list(
+                    self.pending_tasks()
+                    .filter(id__gt=last_id)
+                    .order_by("id")[:chunk_size]
+                )
 
-            # ----------------------------------------
-            # STEP 2: Skip snoozed tasks
-            # ----------------------------------------
-            if task.snooze_until and task.snooze_until > now:
-                continue
+                fresh_maps = {}
+                for task in chunk:
+                    self.process(task, now, fresh_maps)
 
-            # ----------------------------------------
-            # STEP 3: Determine reminder interval
-            # ----------------------------------------
-            if task.urgency == "CRITICAL":
-                reminder_interval = timedelta(hours=2)
-            elif task.urgency == "HIGH":
-                reminder_interval = timedelta(hours=4)
-            elif task.urgency == "NORMAL":
-                reminder_interval = timedelta(hours=12)
-            else:
-                reminder_interval = timedelta(hours=24)
+            if len(chunk) < chunk_size:
+                break
+
+            last_id = chunk[-1].id
+
+    def pending_tasks(self):
+        tasks = ApprovalTask.objects.filter(status="PENDING")
+        if self.organization_id is not None:
+            tasks = tasks.filter(organization_id=self.organization_id)
+
+        return (
+            tasks
+            .select_related("approver__organization", "requester")
+            # Everyone a multi-level task is waiting on
+            .prefetch_related(Prefetch(
+                "steps",
+                queryset=ApprovalStep.objects.filter(status="PENDING").select_related("approver"),
+                to_attr="pending_steps",
+            ))
+            .annotate(
+                last_reminder_at=Max(
+                    "audit_logs__timestamp",
+                    filter=Q(audit_logs__action="REMINDER"),
+                ),
+                escalated=Exists(
+                    AuditLog.objects.filter(task=OuterRef("pk"), action="ESCALATED")
+                ),
+            )
+        )
+
+    def reminder_interval(self, task, calendar):
+        """
+        Working seconds between reminders.
+        """
+        if task.urgency == "CRITICAL":
+            return 2 * 3600
+        elif task.urgency == "HIGH":
+            return 4 * 3600
+        elif task.urgency == "NORMAL":
+            return calendar.working_day / 2
+        return calendar.working_day
+
+    def process(self, task, now, fresh_maps):
+
+        # ----------------------------------------
+        # Hand tasks of approvers who are away to
+        # their delegate (one map lookup per task)
+        # ----------------------------------------
+        if not task.stage_plan:
+            delegate_id = delegation_map(task.organization_id).for_task(task)
+            if delegate_id != task.approver_id:
+                # The cached map may lag a rule change made elsewhere;
+                # the fresh one is built once per chunk
+                delegate_id = confirmed_delegate(task, fresh_maps)
+            if delegate_id != task.approver_id and not self.delegate(task, delegate_id):
+                return
+
+        # ----------------------------------------
+        # STEP 2: Skip snoozed tasks
+        # ----------------------------------------
+        if task.snooze_until and task.snooze_until > now:
+            return
 
-            # ----------------------------------------
-            # STEP 4: Check if reminder needed
-            # ----------------------------------------
-            last_action = AuditLog.objects.filter(
-                task=task,
-                action="REMINDER"
-            ).order_by("-timestamp").first()
+        # SLA clock: working time in the approver's timezone,
+        # using their organization's hours and holidays
+        calendar = calendar_for(task.approver.organization, task.approver.timezone)
 
-            last_reminder_time = last_action.timestamp if last_action else task.created_at
+        # ----------------------------------------
+        # STEP 3: Determine reminder interval
+        # (working time)
+        # ----------------------------------------
+        reminder_interval = self.reminder_interval(task, calendar)
 
-            if now - last_reminder_time >= reminder_interval:
-                self.send_reminder(task)
-                continue  # Avoid escalation on same cycle
+        # ----------------------------------------
+        # STEP 4: Check if reminder needed
+        # ----------------------------------------
+        last_reminder_time = task.last_reminder_at or task.created_at
 
-            # ----------------------------------------
-            # STEP 5: Escalation check (48 hours)
-            # ----------------------------------------
-            if now - task.created_at >= timedelta(hours=48):
-                self.escalate(task)
+        if calendar.elapsed(last_reminder_time, now) >= reminder_interval:
+            self.send_reminder(task)
+            return  # Avoid escalation on same cycle
+
+        # ----------------------------------------
+        # STEP 5: Escalation check (2 working days)
+        # Multi-level tasks follow their workflow's
+        # approvers; only single-approver tasks escalate.
+        # ----------------------------------------
+        if (
+            calendar.elapsed(task.created_at, now) >= 2 * calendar.working_day
+            and not task.stage_plan
+        ):
+            self.escalate(task)
+
+    # =====================================================
+    # DAEMON MODE
+    # Due times live in a heap; the process sleeps until the
+    # next one (or the next poll for changed tasks), so it
+    # fires within seconds and is idle in between.
+    # =====================================================
+    def next_due(self, task):
+        """
+        When process() will next have something to do for this task.
+        """
+
+        calendar = calendar_for(task.approver.organization, task.approver.timezone)
+
+        candidates = [calendar.deadline(
+            task.last_reminder_at or task.created_at,
+            self.reminder_interval(task, calendar),
+        )]
+
+        if not task.stage_plan and not task.escalated:
+            candidates.append(calendar.deadline(task.created_at, 2 * calendar.working_day))
+
+        candidates = [due for due in candidates if due is not None]
+        if not candidates:
+            # Beyond the precomputed calendar: look again tomorrow
+            return timezone.now() + timedelta(days=1)
+
+        due = min(candidates)
+        if task.snooze_until and task.snooze_until > due:
+            due = task.snooze_until
+        return due
+
+    def run_daemon(self, options):
+        poll = timedelta(seconds=options["poll_seconds"])
+        scheduler = ReminderScheduler(self, options["state_file"], options["chunk_size"], poll)
+
+        # SIGTERM (systemd / docker stop) exits through the
+        # finally block below, so the schedule is checkpointed.
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+        scheduler.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"[DAEMON] Tracking {len(scheduler.due)} pending approvals"
+        ))
+
+        try:
+            while True:
+                now = timezone.now()
+
+                if now >= scheduler.polled_at + poll:
+                    scheduler.poll()
+                    scheduler.checkpoint()
+
+                scheduler.fire_due(now)
+
+                wake_at = scheduler.polled_at + poll
+                if scheduler.heap:
+                    wake_at = min(wake_at, scheduler.next_time())
+
+                time.sleep(max(0.0, (wake_at - timezone.now()).total_seconds()))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduler.checkpoint()
+            self.stdout.write("[DAEMON] Stopped, schedule saved")
 
     # =====================================================
     # REMINDER LOGIC
     # =====================================================
     def send_reminder(self, task):
+        # Multi-level tasks: every approver of the current stage
+        # who has not decided yet (an ALL stage waits on each)
+        approvers = [
+            step.approver for step in task.pending_steps
+            if step.stage == task.current_stage
+        ] or [task.approver]
+
         AuditLog.objects.create(
             task=task,
             action="REMINDER",
             performed_by=None,
-            remarks=f"Automated reminder sent to {task.approver.username}"
+            remarks=f"Automated reminder sent to {', '.join(a.username for a in approvers)}"
         )
 
-        if task.approver.email:
-            send_notification_email(
-                subject="Approval Reminder",
-                message=f"""
-Hello {task.approver.username},
+        # Written with the rest of the chunk; any email is sent
+        # once the chunk commits, never inside the write lock.
+        notify(
+            "REMINDER",
+            task,
+            approvers,
+            f"Reminder: \"{task.title}\" is waiting for your decision",
+            subject="Approval Reminder",
+            message=f"""
+Hello,
 
 This is a reminder for the pending approval:
 
@@ -80,8 +287,7 @@ Urgency: {task.urgency}
 
 Please take action.
 """,
-                recipient_list=[task.approver.email]
-            )
+        )
 
         self.stdout.write(
             self.style.WARNING(
@@ -89,6 +295,43 @@ Please take action.
             )
         )
 
+    # =====================================================
+    # DELEGATION
+    # =====================================================
+    def delegate(self, task, delegate_id):
+        delegate = User.objects.select_related("organization").filter(
+            pk=delegate_id,
+            organization_id=task.organization_id,
+        ).first()
+        if delegate is None:
+            return True  # Not a valid delegate: the approver keeps it
+
+        previous = task.approver
+
+        try:
+            task.apply(approver=delegate)
+        except TaskConflict:
+            return False
+
+        AuditLog.objects.create(
+            task=task,
+            action="REASSIGNED",
+            performed_by=None,
+            remarks=f"Delegated by {previous.username} to {delegate.username} (out of office)"
+        )
+
+        notify(
+            "REASSIGNED",
+            task,
+            [delegate],
+            f"\"{task.title}\" was delegated to you by {previous.username}",
+        )
+
+        self.stdout.write(
+            f"[DELEGATED] Task '{task.title}' → {delegate.username}"
+        )
+        return True
+
     # =====================================================
     # ESCALATION LOGIC
     # =====================================================
@@ -101,12 +344,16 @@ Please take action.
         if already_escalated:
             return
 
-        admin = User.objects.filter(role="ADMIN").first()
+        # An admin of the task's own organization
+        admin = User.objects.filter(role="ADMIN", organization_id=task.organization_id).first()
         if not admin:
             return
 
-        task.approver = admin
-        task.save()
+        # Conditional update: a decision that landed meanwhile wins
+        try:
+            task.apply(approver=admin)
+        except TaskConflict:
+            return
 
         AuditLog.objects.create(
             task=task,
@@ -116,10 +363,13 @@ Please take action.
         )
 
         # Notify admin
-        if admin.email:
-            send_notification_email(
-                subject="Approval Escalated",
-                message=f"""
+        notify(
+            "ESCALATED",
+            task,
+            [admin],
+            f"\"{task.title}\" was escalated to you",
+            subject="Approval Escalated",
+            message=f"""
 Hello {admin.username},
 
 An approval has been escalated to you due to delay.
@@ -127,11 +377,150 @@ An approval has been escalated to you due to delay.
 Title: {task.title}
 Original approver did not respond within SLA.
 """,
-                recipient_list=[admin.email]
-            )
+        )
 
         self.stdout.write(
             self.style.ERROR(
                 f"[ESCALATED] Task '{task.title}' escalated to ADMIN"
             )
         )
+
+
+class ReminderScheduler:
+    """
+    In-memory schedule of pending tasks for the daemon.
+    `due` holds the current due time per task; the heap may
+    contain stale entries, which are skipped when popped.
+    """
+
+    # Re-read a little before the last poll so rows whose
+    # transaction committed late are not missed.
+    POLL_OVERLAP = timedelta(seconds=5)
+
+    # Longest wait before retrying a task nothing could be done for
+    MAX_BACKOFF = timedelta(hours=1)
+
+    def __init__(self, command, state_file, chunk_size, poll_interval):
+        self.command = command
+        self.state_file = Path(state_file)
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.due = {}
+        self.heap = []
+        self.retries = {}   # task id -> fruitless passes in a row
+        self.polled_at = timezone.now()
+
+    def schedule(self, task_id, due):
+        self.due[task_id] = due
+        heapq.heappush(self.heap, (due, task_id))
+
+    def next_time(self):
+        return self.heap[0][0]
+
+    def refresh(self, tasks):
+        for task in tasks:
+            self.retries.pop(task.id, None)  # Changed: worth trying again
+            self.schedule(task.id, self.command.next_due(task))
+
+    # -----------------------------------------------------
+    def start(self):
+        """
+        Restores the checkpoint (then only changes since it are
+        read) or loads the whole pending set once, in chunks.
+        """
+
+        if self.state_file.exists():
+            state = json.loads(self.state_file.read_text())
+            self.polled_at = datetime.fromisoformat(state["polled_at"])
+            for task_id, due in state["due"].items():
+                self.schedule(int(task_id), datetime.fromisoformat(due))
+            self.poll()
+            return
+
+        self.polled_at = timezone.now()
+        last_id = 0
+
+        while True:
+            chunk = list(
+                self.command.pending_tasks()
+                .filter(id__gt=last_id)
+                .order_by("id")[:self.chunk_size]
+            )
+            self.refresh(chunk)
+
+            if len(chunk) < self.chunk_size:
+                break
+            last_id = chunk[-1].id
+
+    def poll(self):
+        """
+        Picks up new tasks, decisions, snoozes and reassignments
+        (all of them move updated_at).
+        """
+
+        started = timezone.now()
+        changed = ApprovalTask.objects.filter(
+            updated_at__gt=self.polled_at - self.POLL_OVERLAP
+        ).values_list("id", "status")
+
+        pending_ids = []
+        for task_id, status in changed.iterator():
+            if status == "PENDING":
+                pending_ids.append(task_id)
+            else:
+                self.due.pop(task_id, None)
+
+        for start in range(0, len(pending_ids), self.chunk_size):
+            ids = pending_ids[start:start + self.chunk_size]
+            self.refresh(self.command.pending_tasks().filter(id__in=ids))
+
+        self.polled_at = started
+
+    def fire_due(self, now):
+        fresh_maps = {}
+
+        while self.heap and self.heap[0][0] <= now:
+            due, task_id = heapq.heappop(self.heap)
+
+            if self.due.get(task_id) != due:
+                continue  # superseded or no longer pending
+
+            task = self.command.pending_tasks().filter(id=task_id).first()
+            if task is None:
+                del self.due[task_id]
+                self.retries.pop(task_id, None)
+                continue
+
+            with transaction.atomic(using=router.db_for_write(ApprovalTask)), batched():
+                self.command.process(task, now, fresh_maps)
+
+            # Reminder / escalation changed the task: reschedule
+            task = self.command.pending_tasks().filter(id=task_id).first()
+            if task is None:
+                del self.due[task_id]
+                self.retries.pop(task_id, None)
+                continue
+
+            due = self.command.next_due(task)
+            if due <= now:
+                # Still due: nothing could be done (no ADMIN to escalate
+                # to, a conflicting change). Back off from one poll
+                # interval up to MAX_BACKOFF until the task changes.
+                retries = self.retries.get(task_id, 0)
+                self.retries[task_id] = retries + 1
+                due = now + min(self.poll_interval * 2 ** min(retries, 20), self.MAX_BACKOFF)
+            else:
+                self.retries.pop(task_id, None)
+
+            self.schedule(task.id, due)
+
+    def checkpoint(self):
+        state = {
+            "polled_at": self.polled_at.isoformat(),
+            "due": {str(task_id): due.isoformat() for task_id, due in self.due.items()},
+        }
+
+        # Write-then-rename so a crash never leaves half a file
+        tmp = self.state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self.state_file)
@@ -0,0 +1,74 @@
+import hmac
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from core.webhooks import sign
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Accepts webhook POSTs over keep-alive connections.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        options = self.server.options
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if options["delay"]:
+            time.sleep(options["delay"])
+
+        status = 200
+        if options["secret"]:
+            expected = "sha256=" + sign(options["secret"], self.headers.get("X-Webhook-Timestamp", ""), body)
+            if not hmac.compare_digest(expected, self.headers.get("X-Webhook-Signature", "")):
+                status = 401
+
+        if status == 200 and random.random() < options["fail_rate"]:
+            status = 503
+
+        if status == 200:
+            events = json.loads(body)["events"]
+            self.server.received += len(events)
+            for event in events:
+                self.server.stdout.write(f"[STUB] {event['event']} task #{event['task']['id']}")
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Local webhook receiver for development and tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--secret", default="", help="Verify signatures with this secret")
+        parser.add_argument("--delay", type=float, default=0, help="Seconds to wait per request")
+        parser.add_argument("--fail-rate", type=float, default=0, help="Share of requests answered 503")
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), StubHandler)
+        server.options = options
+        server.stdout = self.stdout
+        server.received = 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"[STUB] Listening on http://127.0.0.1:{options['port']}/"
+        ))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"[STUB] {server.received} events received")
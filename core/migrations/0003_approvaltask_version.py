@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_auditlog_options_alter_approvaltask_approver_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvaltask',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
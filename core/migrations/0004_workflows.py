@@ -0,0 +1,81 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_approvaltask_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvaltask',
+            name='current_stage',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='approvaltask',
+            name='stage_approved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='approvaltask',
+            name='stage_plan',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='approvaltask',
+            name='stage_rejected',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Workflow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('organization', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='workflows', to='core.organization')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='approvaltask',
+            name='workflow',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='core.workflow'),
+        ),
+        migrations.CreateModel(
+            name='ApprovalStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('SKIPPED', 'Skipped')], default='WAITING', max_length=20)),
+                ('decided_at', models.DateTimeField(blank=True, null=True)),
+                ('approver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='approval_steps', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='core.approvaltask')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['approver', 'status'], name='core_approv_approve_0674a8_idx'), models.Index(fields=['task', 'stage'], name='core_approv_task_id_07c2d0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'stage', 'approver'), name='unique_step_approver')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkflowStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('rule', models.CharField(choices=[('ANY', 'Any one approver'), ('ALL', 'All approvers'), ('QUORUM', 'Quorum')], default='ANY', max_length=10)),
+                ('quorum', models.PositiveIntegerField(blank=True, null=True)),
+                ('approvers', models.ManyToManyField(related_name='workflow_stages', to=settings.AUTH_USER_MODEL)),
+                ('workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to='core.workflow')),
+            ],
+            options={
+                'ordering': ['order'],
+                'constraints': [models.UniqueConstraint(fields=('workflow', 'order'), name='unique_stage_order')],
+            },
+        ),
+    ]
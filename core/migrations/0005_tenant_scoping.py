@@ -0,0 +1,68 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_organizations(apps, schema_editor):
+    """
+    One UPDATE per table: tasks take the requester's
+    organization, audit rows take their task's.
+    """
+    User = apps.get_model('core', 'User')
+    ApprovalTask = apps.get_model('core', 'ApprovalTask')
+    AuditLog = apps.get_model('core', 'AuditLog')
+
+    ApprovalTask.objects.update(organization_id=Subquery(
+        User.objects.filter(pk=OuterRef('requester_id')).values('organization_id')[:1]
+    ))
+    AuditLog.objects.update(organization_id=Subquery(
+        ApprovalTask.objects.filter(pk=OuterRef('task_id')).values('organization_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0004_workflows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='approvaltask',
+            name='organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='audit_logs', to='core.organization'),
+        ),
+        migrations.RunPython(copy_organizations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['organization', 'approver', 'status'], name='core_approv_organiz_049770_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['organization', 'requester'], name='core_approv_organiz_daedf4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['organization', 'status', 'created_at'], name='core_approv_organiz_48cf63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', 'task', 'timestamp'], name='core_auditl_organiz_226f09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['organization', 'timestamp'], name='core_auditl_organiz_c0dcbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['organization', 'role'], name='core_user_organiz_72d006_idx'),
+        ),
+    ]
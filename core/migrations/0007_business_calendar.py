@@ -0,0 +1,42 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:15
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='work_days',
+            field=models.CharField(default='0,1,2,3,4', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='work_end',
+            field=models.TimeField(default=datetime.time(18, 0)),
+        ),
+        migrations.AddField(
+            model_name='organization',
+            name='work_start',
+            field=models.TimeField(default=datetime.time(9, 0)),
+        ),
+        migrations.CreateModel(
+            name='Holiday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(blank=True, max_length=100)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='core.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('organization', 'date'), name='unique_holiday')],
+            },
+        ),
+    ]
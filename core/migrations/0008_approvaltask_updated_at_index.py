@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_business_calendar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvaltask',
+            index=models.Index(fields=['updated_at'], name='core_approv_updated_3e9e95_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_approvaltask_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('CREATED', 'Created'), ('REMINDER', 'Reminder Sent'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('SNOOZED', 'Snoozed'), ('ESCALATED', 'Escalated'), ('REASSIGNED', 'Reassigned')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp'], name='core_auditl_timesta_80074f_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('urgency', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('requester_id', models.BigIntegerField()),
+                ('requester_name', models.CharField(max_length=150)),
+                ('approver_id', models.BigIntegerField()),
+                ('approver_name', models.CharField(max_length=150)),
+                ('workflow_id', models.BigIntegerField(null=True)),
+                ('stage_plan', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('organization', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.organization')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAuditLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=20)),
+                ('performed_by_id', models.BigIntegerField(null=True)),
+                ('performed_by_name', models.CharField(blank=True, max_length=150)),
+                ('timestamp', models.DateTimeField()),
+                ('remarks', models.TextField(blank=True)),
+                ('organization', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.organization')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_logs', to='core.archivedtask')),
+            ],
+            options={
+                'ordering': ['timestamp'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['organization', 'requester_id', 'created_at'], name='core_archiv_organiz_56b805_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedtask',
+            index=models.Index(fields=['organization', 'approver_id', 'created_at'], name='core_archiv_organiz_81f6a7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauditlog',
+            index=models.Index(fields=['task', 'timestamp'], name='core_archiv_task_id_2ed47c_idx'),
+        ),
+    ]
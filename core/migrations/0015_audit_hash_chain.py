@@ -0,0 +1,47 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedauditlog',
+            name='entry_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='archivedauditlog',
+            name='prev_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='entry_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='prev_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='archivedauditlog',
+            index=models.Index(fields=['task', 'id'], name='core_archiv_task_id_31fd42_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['task', 'id'], name='core_auditl_task_id_00160a_idx'),
+        ),
+    ]
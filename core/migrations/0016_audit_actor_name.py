@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:50
+
+from django.db import migrations, models, router
+from django.db.models import OuterRef, Subquery
+
+from core.hashchain import GENESIS, seal
+
+
+def seal_existing(apps, schema_editor):
+    """
+    Captures the actors' usernames, then (re)chains every row
+    in id order per task, wherever each table lives.
+    """
+    db = schema_editor.connection.alias
+    User = apps.get_model('core', 'User')
+
+    for name in ('AuditLog', 'ArchivedAuditLog'):
+        model = apps.get_model('core', name)
+        if not router.allow_migrate_model(db, model):
+            continue
+
+        if name == 'AuditLog':
+            model.objects.using(db).filter(performed_by__isnull=False).update(performed_by_name=Subquery(
+                User.objects.filter(pk=OuterRef('performed_by_id')).values('username')[:1]
+            ))
+
+        heads = {}
+        last_id = 0
+        while True:
+            chunk = list(model.objects.using(db).filter(id__gt=last_id).order_by('id')[:2000])
+            if not chunk:
+                break
+            for entry in chunk:
+                heads[entry.task_id] = seal(entry, heads.get(entry.task_id, GENESIS))
+            model.objects.using(db).bulk_update(chunk, ['prev_hash', 'entry_hash'])
+            last_id = chunk[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_audit_hash_chain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='performed_by_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(seal_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:13
+
+from django.db import migrations, models
+
+
+def restore_default_emails(apps, schema_editor):
+    """
+    Inboxes still on the old default (created on the first visit
+    to the Notifications page or by "Mark all as read") get the
+    emails they received before the inbox existed.
+    """
+    Inbox = apps.get_model('core', 'Inbox')
+    Inbox.objects.using(schema_editor.connection.alias).filter(email_kinds='ESCALATED').update(
+        email_kinds='REQUEST,APPROVED,REJECTED,REMINDER,ESCALATED',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_audit_actor_name'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inbox',
+            name='email_kinds',
+            field=models.CharField(default='REQUEST,APPROVED,REJECTED,REMINDER,ESCALATED', max_length=100),
+        ),
+        migrations.RunPython(restore_default_emails, migrations.RunPython.noop),
+    ]
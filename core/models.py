@@ -1,7 +1,21 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
+import datetime
+import secrets
+
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.utils import timezone
 
+from .hashchain import GENESIS, seal
+from .tenancy import TenantManager
+
+
+class TaskConflict(Exception):
+    """
+    Raised when a task changed (or was decided) after it was loaded.
+    """
+
 
 # =========================================================
 # ORGANIZATION
@@ -16,10 +30,40 @@ class Organization(models.Model):
 
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Working hours for the SLA clock (in each approver's timezone)
+    work_start = models.TimeField(default=datetime.time(9, 0))
+    work_end = models.TimeField(default=datetime.time(18, 0))
+
+    # Weekday numbers, Monday = 0
+    work_days = models.CharField(max_length=20, default="0,1,2,3,4")
+
     def __str__(self):
         return self.name
 
 
+class Holiday(models.Model):
+    """
+    A non-working day for one organization.
+    """
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="holidays"
+    )
+
+    date = models.DateField()
+    name = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'date'], name='unique_holiday'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
+
+
 # =========================================================
 # TEAM
 # =========================================================
@@ -81,10 +125,212 @@ class User(AbstractUser):
         default='Asia/Kolkata'
     )
 
+    objects = UserManager()
+
+    # Users of the current organization only (see core.tenancy)
+    tenant = TenantManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['organization', 'role']),
+        ]
+
     def __str__(self):
         return self.username
 
 
+# =========================================================
+# DELEGATION / OUT OF OFFICE
+# Rules are resolved into a cached effective-approver map
+# (core.delegation); nothing evaluates them per task.
+# =========================================================
+class DelegationRule(models.Model):
+    """
+    While active, approvals for `delegator` go to `delegate`.
+    Optionally limited to one urgency and / or to requests
+    from one team.
+    """
+
+    # Copied from the delegator
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="delegation_rules"
+    )
+
+    delegator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="delegations_given"
+    )
+
+    delegate = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="delegations_received"
+    )
+
+    starts_at = models.DateTimeField(default=timezone.now)
+    ends_at = models.DateTimeField()
+
+    # Blank = every urgency / every team
+    urgency = models.CharField(max_length=20, blank=True, help_text="LOW, MEDIUM, HIGH or CRITICAL")
+    team = models.ForeignKey(
+        Team,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="delegation_rules"
+    )
+
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'is_active', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.delegator} → {self.delegate} ({self.starts_at:%Y-%m-%d} – {self.ends_at:%Y-%m-%d})"
+
+    def clean(self):
+        if self.ends_at and self.starts_at and self.ends_at <= self.starts_at:
+            raise ValidationError("The end must be after the start.")
+
+        if self.urgency and self.urgency not in dict(ApprovalTask.URGENCY_CHOICES):
+            raise ValidationError("Unknown urgency.")
+
+        if self.delegator_id and self.delegator_id == self.delegate_id:
+            raise ValidationError("A user cannot delegate to themselves.")
+
+        if self.delegator_id and self.delegate_id and self.delegate.organization_id != self.delegator.organization_id:
+            raise ValidationError("The delegate must belong to the delegator's organization.")
+
+        if self.delegator_id and self.delegate_id and self.ends_at and self._closes_cycle():
+            raise ValidationError("This rule would create a delegation cycle.")
+
+    def _closes_cycle(self):
+        """
+        True if the delegate already hands work (directly or
+        through a chain) back to the delegator while this rule
+        is active. Scopes are ignored: stricter than needed.
+        """
+
+        edges = {}
+        for delegator_id, delegate_id in DelegationRule.objects.filter(
+            delegator__organization_id=self.delegator.organization_id,
+            is_active=True,
+            starts_at__lt=self.ends_at,
+            ends_at__gt=self.starts_at,
+        ).exclude(pk=self.pk).values_list("delegator_id", "delegate_id"):
+            edges.setdefault(delegator_id, set()).add(delegate_id)
+
+        seen = set()
+        pending = [self.delegate_id]
+
+        while pending:
+            user_id = pending.pop()
+            if user_id == self.delegator_id:
+                return True
+            if user_id not in seen:
+                seen.add(user_id)
+                pending.extend(edges.get(user_id, ()))
+
+        return False
+
+    def save(self, *args, **kwargs):
+        if self.organization_id is None and self.delegator_id:
+            self.organization_id = self.delegator.organization_id
+        super().save(*args, **kwargs)
+
+
+# =========================================================
+# WORKFLOW DEFINITION
+# =========================================================
+class Workflow(models.Model):
+    """
+    Reusable multi-level approval route: an ordered list of stages.
+    """
+
+    name = models.CharField(max_length=200)
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="workflows"
+    )
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
+    def __str__(self):
+        return self.name
+
+
+class WorkflowStage(models.Model):
+    """
+    One level of a workflow.
+    Its approvers decide in parallel; the rule says how many
+    approvals close the stage. Stages run one after another.
+    """
+
+    RULE_CHOICES = (
+        ('ANY', 'Any one approver'),
+        ('ALL', 'All approvers'),
+        ('QUORUM', 'Quorum'),
+    )
+
+    workflow = models.ForeignKey(
+        Workflow,
+        on_delete=models.CASCADE,
+        related_name="stages"
+    )
+
+    order = models.PositiveIntegerField(default=0)
+
+    name = models.CharField(max_length=100, blank=True)
+
+    rule = models.CharField(
+        max_length=10,
+        choices=RULE_CHOICES,
+        default='ANY'
+    )
+
+    # Only used by the QUORUM rule
+    quorum = models.PositiveIntegerField(null=True, blank=True)
+
+    approvers = models.ManyToManyField(
+        User,
+        related_name="workflow_stages"
+    )
+
+    class Meta:
+        ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['workflow', 'order'], name='unique_stage_order'),
+        ]
+
+    def __str__(self):
+        return f"{self.workflow.name} #{self.order} ({self.rule})"
+
+    def required_approvals(self, size):
+        if self.rule == 'ALL':
+            return size
+        if self.rule == 'QUORUM':
+            return max(1, min(self.quorum or 1, size))
+        return 1
+
+
 # =========================================================
 # APPROVAL TASK
 # =========================================================
@@ -110,6 +356,15 @@ class ApprovalTask(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
 
+    # Copied from the requester so tenant queries need no join
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="tasks"
+    )
+
     requester = models.ForeignKey(
         User,
         related_name='requested_tasks',
@@ -148,24 +403,224 @@ class ApprovalTask(models.Model):
 
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Optimistic concurrency: bumped by every apply()
+    version = models.PositiveIntegerField(default=0)
+
+    # ---------------------------------------------
+    # MULTI-LEVEL WORKFLOW (optional)
+    # Without a workflow the task has a single approver.
+    # With one, `approver` is the first approver of the
+    # current stage and the decisions live in ApprovalStep.
+    # ---------------------------------------------
+    workflow = models.ForeignKey(
+        Workflow,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tasks"
+    )
+
+    # Frozen copy of the route: [{"size": n, "required": k}, ...]
+    stage_plan = models.JSONField(default=list, blank=True)
+
+    current_stage = models.PositiveIntegerField(default=0)
+
+    # Decisions so far in the current stage (kept incrementally)
+    stage_approved = models.PositiveIntegerField(default=0)
+    stage_rejected = models.PositiveIntegerField(default=0)
+
+    # Allowed status changes. Only PENDING tasks can change.
+    TRANSITIONS = {
+        'PENDING': ('APPROVED', 'REJECTED'),
+    }
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
     class Meta:
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['urgency']),
             models.Index(fields=['created_at']),
+            # Tenant-leading: each organization's rows are one range
+            models.Index(fields=['organization', 'approver', 'status']),
+            models.Index(fields=['organization', 'requester']),
+            models.Index(fields=['organization', 'status', 'created_at']),
+            # Incremental polling by the reminder daemon
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    def save(self, *args, **kwargs):
+        if self.organization_id is None and self.requester_id:
+            self.organization_id = self.requester.organization_id
+        super().save(*args, **kwargs)
+
+    def apply(self, status=None, **changes):
+        """
+        Changes a PENDING task with one conditional UPDATE:
+        ... WHERE status = 'PENDING' AND version = <loaded version>.
+        No row lock is taken; if anyone else changed the task
+        first, nothing is written and TaskConflict is raised.
+        Only the given columns (plus version / updated_at) are written.
+        """
+
+        if self.status not in self.TRANSITIONS:
+            raise TaskConflict(f"Task is already {self.status}")
+
+        if status is not None:
+            if status not in self.TRANSITIONS[self.status]:
+                raise TaskConflict(f"Cannot move from {self.status} to {status}")
+            changes['status'] = status
+
+        changes['updated_at'] = timezone.now()
+
+        updated = ApprovalTask.objects.filter(
+            pk=self.pk,
+            status=self.status,
+            version=self.version,
+        ).update(version=F('version') + 1, **changes)
+
+        if not updated:
+            raise TaskConflict("Task was changed by someone else")
+
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.version += 1
+
+
+# =========================================================
+# APPROVAL STEP
+# =========================================================
+class ApprovalStepQuerySet(models.QuerySet):
+
+    def actionable_for(self, user):
+        """
+        Steps waiting on this user right now
+        (served by the (approver, status) index).
+        """
+        return self.filter(approver=user, status='PENDING')
+
+
+class ApprovalStep(models.Model):
+    """
+    One approver's decision within one stage of a task.
+    Steps of later stages wait until their stage starts.
+    """
+
+    STATUS_CHOICES = (
+        ('WAITING', 'Waiting'),
+        ('PENDING', 'Pending'),
+        ('APPROVED', 'Approved'),
+        ('REJECTED', 'Rejected'),
+        ('SKIPPED', 'Skipped'),
+    )
+
+    task = models.ForeignKey(
+        ApprovalTask,
+        on_delete=models.CASCADE,
+        related_name='steps'
+    )
+
+    # Index into task.stage_plan
+    stage = models.PositiveIntegerField()
+
+    approver = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='approval_steps'
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='WAITING'
+    )
+
+    decided_at = models.DateTimeField(null=True, blank=True)
+
+    objects = ApprovalStepQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['approver', 'status']),
+            models.Index(fields=['task', 'stage']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'stage', 'approver'], name='unique_step_approver'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} stage {self.stage}: {self.approver_id} ({self.status})"
+
 
 # =========================================================
 # AUDIT LOG
 # =========================================================
+class AuditLogQuerySet(models.QuerySet):
+
+    def seal(self, entries):
+        """
+        Chains unsaved entries (in list order) onto their tasks'
+        latest entries. The tasks are locked first, so concurrent
+        writers of the same task queue up instead of forking its
+        chain; two queries cover a whole bulk_create batch.
+        """
+
+        db = router.db_for_write(AuditLog)
+        task_ids = {entry.task_id for entry in entries}
+
+        # Lock, then read the heads in a new statement: on
+        # PostgreSQL a statement that waited for the lock still
+        # reads with its own snapshot, which would miss the entry
+        # the lock holder just committed
+        organizations = dict(
+            ApprovalTask.objects.using(db).select_for_update()
+            .filter(id__in=task_ids)
+            .order_by('id')
+            .values_list('id', 'organization_id')
+        )
+        heads = dict(
+            ApprovalTask.objects.using(db)
+            .filter(id__in=task_ids)
+            .annotate(head=Subquery(
+                AuditLog.objects.filter(task=OuterRef('pk')).order_by('-id').values('entry_hash')[:1]
+            ))
+            .values_list('id', 'head')
+        )
+
+        # The actor's username as of now is part of the hash
+        missing = {
+            entry.performed_by_id for entry in entries
+            if entry.performed_by_id and not entry.performed_by_name
+            and not AuditLog.performed_by.is_cached(entry)
+        }
+        usernames = dict(User.objects.using(db).filter(pk__in=missing).values_list('pk', 'username')) if missing else {}
+
+        for entry in entries:
+            if entry.organization_id is None:
+                entry.organization_id = organizations.get(entry.task_id)
+            if entry.performed_by_id and not entry.performed_by_name:
+                entry.performed_by_name = (
+                    entry.performed_by.username if AuditLog.performed_by.is_cached(entry)
+                    else usernames.get(entry.performed_by_id, "")
+                )
+            heads[entry.task_id] = seal(entry, heads.get(entry.task_id) or GENESIS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            self.seal(objs)
+            return super().bulk_create(objs, *args, **kwargs)
+
+
 class AuditLog(models.Model):
     """
     Immutable event log for approvals.
-    This is the proof layer of the system.
+    This is the proof layer of the system: rows are hash-chained
+    per task (core.hashchain, `manage.py verify_audit_chain`).
     """
 
     ACTION_CHOICES = (
@@ -175,6 +630,7 @@ class AuditLog(models.Model):
         ('REJECTED', 'Rejected'),
         ('SNOOZED', 'Snoozed'),
         ('ESCALATED', 'Escalated'),
+        ('REASSIGNED', 'Reassigned'),
     )
 
     task = models.ForeignKey(
@@ -183,6 +639,15 @@ class AuditLog(models.Model):
         related_name='audit_logs'
     )
 
+    # Copied from the task on save
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="audit_logs"
+    )
+
     action = models.CharField(
         max_length=20,
         choices=ACTION_CHOICES
@@ -195,12 +660,442 @@ class AuditLog(models.Model):
         blank=True
     )
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set on construction (not on save) so it is hashed with the rest
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    remarks = models.TextField(blank=True)
+
+    # Captured on insert and hashed instead of performed_by,
+    # which a deleted user sets to NULL
+    performed_by_name = models.CharField(max_length=150, blank=True, default="", editable=False)
+
+    prev_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+    entry_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    objects = AuditLogQuerySet.as_manager()
+    tenant = TenantManager()
+
+    class Meta:
+        ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['organization', 'task', 'timestamp']),
+            models.Index(fields=['organization', 'timestamp']),
+            # Admin changelist ordering / date drill-down
+            models.Index(fields=['timestamp']),
+            # Chain head lookup and chain-ordered verification
+            models.Index(fields=['task', 'id']),
+        ]
+
+    def __str__(self):
+        # task_id only: no extra query per row in lists
+        return f"Task #{self.task_id} → {self.action}"
+
+    def save(self, *args, **kwargs):
+        # Existing rows keep their hashes: an edit shows up
+        # as a broken link
+        if not self._state.adding or self.entry_hash:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(AuditLog)):
+            AuditLog.objects.seal([self])
+            super().save(*args, **kwargs)
+
+
+# =========================================================
+# ANALYTICS ROLLUPS
+# =========================================================
+class DecisionRollup(models.Model):
+    """
+    Decisions aggregated per hour / day and per
+    (organization, team, approver, urgency).
+    The latency histogram is mergeable (see core.analytics),
+    so percentiles over any window come from a few rows.
+    """
+
+    GRANULARITY_CHOICES = (
+        ('HOUR', 'Hour'),
+        ('DAY', 'Day'),
+    )
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="decision_rollups"
+    )
+
+    team = models.ForeignKey(
+        Team,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="decision_rollups"
+    )
+
+    approver = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="decision_rollups"
+    )
+
+    urgency = models.CharField(max_length=20)
+
+    decisions = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    sla_breaches = models.PositiveIntegerField(default=0)
+
+    # Time-to-decision histogram: {"bucket index": count}
+    latency_histogram = models.JSONField(default=dict)
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start:%Y-%m-%d %H:00} ({self.decisions})"
+
+
+class AnalyticsCursor(models.Model):
+    """
+    Last AuditLog id processed by one consumer of the log
+    ("decisions" rollups, "webhooks" fan-out).
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    last_audit_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_audit_id}"
+
+    def advance(self, last_audit_id):
+        """
+        Compare-and-set: moves the cursor only if nobody else
+        moved it since it was read. Call it inside the chunk's
+        transaction; False means the chunk was already taken.
+        """
+
+        moved = AnalyticsCursor.objects.filter(
+            pk=self.pk,
+            last_audit_id=self.last_audit_id,
+        ).update(last_audit_id=last_audit_id)
+
+        if moved:
+            self.last_audit_id = last_audit_id
+        return bool(moved)
+
+
+# =========================================================
+# WEBHOOKS
+# Subscriptions are fed from the audit log by a background
+# worker (core.webhooks); nothing is sent from a request.
+# =========================================================
+def _webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    An organization's subscription to approval events.
+    """
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="webhook_endpoints"
+    )
+
+    url = models.URLField(max_length=500)
+
+    # Shared secret for the HMAC-SHA256 signature
+    secret = models.CharField(max_length=64, default=_webhook_secret)
+
+    # Comma-separated AuditLog actions
+    events = models.CharField(max_length=100, default="APPROVED,REJECTED,ESCALATED")
+
+    # Events per POST (1 = one request per event)
+    batch_size = models.PositiveSmallIntegerField(default=1)
+
+    is_active = models.BooleanField(default=True)
+
+    # Circuit breaker: after repeated failures the endpoint
+    # is left alone until circuit_open_until
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    circuit_open_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'is_active']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name}: {self.url}"
+
+    def wants(self, action):
+        return action in {event.strip() for event in self.events.split(",")}
+
+
+class WebhookDelivery(models.Model):
+    """
+    One event for one endpoint (outbox row).
+    The payload is frozen when the event is fanned out.
+    """
+
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('DELIVERED', 'Delivered'),
+        ('FAILED', 'Failed'),
+    )
+
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name="deliveries"
+    )
+
+    audit_log = models.ForeignKey(
+        AuditLog,
+        on_delete=models.CASCADE,
+        related_name="webhook_deliveries"
+    )
+
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
 
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # Fan-out is idempotent: a re-read event is not sent twice
+            models.UniqueConstraint(fields=['endpoint', 'audit_log'], name='unique_webhook_delivery'),
+        ]
+        indexes = [
+            # The worker's "what is due" scan
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.audit_log_id} → endpoint {self.endpoint_id} ({self.status})"
+
+
+# =========================================================
+# IDEMPOTENCY KEYS
+# Durable copy of the key -> response store (core.idempotency);
+# the cache in front of it answers most retries.
+# =========================================================
+class IdempotencyRecord(models.Model):
+    """
+    First response to a request sent with an Idempotency-Key.
+    status_code is empty while the request is still running.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="idempotency_records"
+    )
+
+    key = models.CharField(max_length=255)
+
+    # Hash of method, path and body: a key reused for a
+    # different request is refused, not replayed
+    fingerprint = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=500, blank=True)
+    body = models.BinaryField(blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            # The claim: exactly one request per (user, key) gets the insert
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'in progress'})"
+
+
+# =========================================================
+# IN-APP NOTIFICATIONS
+# Append-only: rows are never updated. "Read" is one cursor
+# per user (Inbox.last_read_id), so marking everything read
+# is a single-row write however many notifications there are.
+# =========================================================
+class Notification(models.Model):
+
+    KIND_CHOICES = (
+        ('REQUEST', 'New approval request'),
+        ('APPROVED', 'Request approved'),
+        ('REJECTED', 'Request rejected'),
+        ('REMINDER', 'Reminder'),
+        ('ESCALATED', 'Escalation'),
+        ('REASSIGNED', 'Delegated to you'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False
+    )
+
+    task = models.ForeignKey(
+        ApprovalTask,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False
+    )
+
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    text = models.CharField(max_length=200)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Unread = user's rows past their cursor: one range scan
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['task']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.text}"
+
+
+class Inbox(models.Model):
+    """
+    Per-user read cursor and email preferences.
+    Users without a row get the defaults.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="inbox"
+    )
+
+    last_read_id = models.BigIntegerField(default=0)
+
+    # Comma-separated Notification kinds that are also emailed;
+    # by default everything that was emailed before the inbox
+    email_kinds = models.CharField(max_length=100, default="REQUEST,APPROVED,REJECTED,REMINDER,ESCALATED")
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.last_read_id}"
+
+    def emails(self, kind):
+        return kind in self.email_kinds.split(",")
+
+
+# =========================================================
+# ARCHIVE (cold storage)
+# Finished tasks and their audit trail, moved out of the
+# working tables by core.archive. Rows keep their original
+# ids. References are plain columns (no FK constraints), so
+# the archive can live in another database; names are
+# copied so reading the archive never needs the user table.
+# =========================================================
+class ArchivedTask(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name="+"
+    )
+
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    urgency = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+
+    requester_id = models.BigIntegerField()
+    requester_name = models.CharField(max_length=150)
+    approver_id = models.BigIntegerField()
+    approver_name = models.CharField(max_length=150)
+
+    workflow_id = models.BigIntegerField(null=True)
+    stage_plan = models.JSONField(default=list)
+
+    created_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization', 'requester_id', 'created_at']),
+            models.Index(fields=['organization', 'approver_id', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, archived)"
+
+
+class ArchivedAuditLog(models.Model):
+
+    id = models.BigIntegerField(primary_key=True)
+
+    task = models.ForeignKey(
+        ArchivedTask,
+        on_delete=models.CASCADE,
+        related_name="audit_logs"
+    )
+
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name="+"
+    )
+
+    action = models.CharField(max_length=20)
+    performed_by_id = models.BigIntegerField(null=True)
+    performed_by_name = models.CharField(max_length=150, blank=True)
+    timestamp = models.DateTimeField()
     remarks = models.TextField(blank=True)
 
+    # Copied as is: archived chains stay verifiable
+    prev_hash = models.CharField(max_length=64, blank=True, default="")
+    entry_hash = models.CharField(max_length=64, blank=True, default="")
+
+    objects = models.Manager()
+    tenant = TenantManager()
+
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['task', 'timestamp']),
+            models.Index(fields=['task', 'id']),
+        ]
 
     def __str__(self):
-        return f"{self.task.title} → {self.action}"
+        return f"Task #{self.task_id} → {self.action} (archived)"
@@ -0,0 +1,141 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from .models import Inbox, Notification
+from .utils import send_notification_email
+
+
+# =========================================================
+# NOTIFICATIONS
+#
+# Every event lands in the in-app inbox (one bulk INSERT).
+# Email only goes to users who kept that kind switched on
+# (by default: all but delegations), after the transaction commits.
+# Unread counters live in the cache and are bumped in place;
+# a missing counter is recounted with one indexed query.
+# =========================================================
+
+DEFAULT_EMAIL_KINDS = Inbox._meta.get_field("email_kinds").default
+
+# With a shared cache (Redis) every process bumps and resets the
+# same counter, so it stays exact and can live for a day. With
+# per-process memory a bump from the reminder job or another
+# worker never reaches this process's copy: the counter is then
+# only a short-lived cache of the indexed recount.
+UNREAD_TIMEOUT = 24 * 60 * 60 if settings.SHARED_CACHE else 10
+
+_batch = ContextVar("notification_batch", default=None)
+
+
+def _unread_key(user_id):
+    return f"inbox:unread:{user_id}"
+
+
+@contextmanager
+def batched():
+    """
+    Collects every notify() inside the block into one write,
+    e.g. a whole chunk of the reminder job.
+    """
+
+    if _batch.get() is not None:
+        yield
+        return
+
+    pending = []
+    token = _batch.set(pending)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+
+    _write(pending)
+
+
+def notify(kind, task, recipients, text, subject=None, message=None):
+    """
+    One event for several users. `subject` / `message` are the
+    email for recipients who still want this kind by email.
+    """
+
+    events = [(user, kind, task, text, subject, message) for user in recipients]
+
+    pending = _batch.get()
+    if pending is not None:
+        pending.extend(events)
+    else:
+        _write(events)
+
+
+def _write(events):
+    if not events:
+        return
+
+    Notification.objects.bulk_create([
+        Notification(user=user, task=task, kind=kind, text=text[:200])
+        for user, kind, task, text, subject, message in events
+    ])
+
+    inboxes = Inbox.objects.in_bulk(
+        {user.pk for user, *_ in events},
+        field_name="user_id",
+    )
+
+    def after_commit():
+        for user, kind, task, text, subject, message in events:
+            try:
+                cache.incr(_unread_key(user.pk))
+            except ValueError:
+                pass  # Not cached: recounted on the next read
+
+            inbox = inboxes.get(user.pk)
+            wants_email = inbox.emails(kind) if inbox else kind in DEFAULT_EMAIL_KINDS.split(",")
+
+            if wants_email and user.email and message:
+                send_notification_email(subject=subject, message=message, recipient_list=[user.email])
+
+    transaction.on_commit(after_commit, using=router.db_for_write(Notification))
+
+
+# =========================================================
+# READING
+# =========================================================
+def unread_count(user):
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+
+    if count is None:
+        last_read_id = Inbox.objects.filter(user=user).values_list("last_read_id", flat=True).first() or 0
+        count = Notification.objects.filter(user=user, id__gt=last_read_id).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+
+    return count
+
+
+def mark_all_read(user):
+    last_id = Notification.objects.filter(user=user).order_by("-id").values_list("id", flat=True).first()
+
+    if last_id is not None:
+        Inbox.objects.update_or_create(user=user, defaults={"last_read_id": last_id})
+
+    # Recounted on the next read, so a notification written
+    # meanwhile is not lost
+    cache.delete(_unread_key(user.pk))
+
+
+def recent(user, limit=50):
+    """
+    Latest notifications, each flagged unread or not.
+    """
+
+    last_read_id = Inbox.objects.filter(user=user).values_list("last_read_id", flat=True).first() or 0
+    notifications = list(
+        Notification.objects.filter(user=user).order_by("-id")[:limit]
+    )
+    for notification in notifications:
+        notification.unread = notification.id > last_read_id
+    return notifications
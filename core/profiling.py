@@ -0,0 +1,300 @@
+import cProfile
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# PER-REQUEST PROFILING
+#
+# Off unless PROFILING_ENABLED: the middleware then removes
+# itself at startup. When on, a request is profiled if a
+# staff user sends the PROFILING_HEADER or it is picked at
+# PROFILING_SAMPLE_RATE. Other requests pay for one header
+# lookup and one random(). SQL parameters (session data,
+# password hashes) are only kept for staff-requested profiles.
+# Streaming responses are not profiled, and a failed write
+# is logged without failing the request.
+#
+# A profiled request writes to PROFILING_DIR:
+#   <id>.json    SQL (timings, duplicates), template timings
+#   <id>.folded  sampled stacks, for flamegraph.pl / speedscope
+#   <id>.prof    cProfile stats instead (`X-Profile: cprofile`)
+# Staff get the id back in the X-Profile-Id response header.
+# =========================================================
+
+_template_timings = ContextVar("template_timings", default=None)
+
+
+def _where(filename):
+    """
+    Short file name for reports: relative to the project,
+    or to site-packages for libraries.
+    """
+
+    path = str(filename)
+    base = str(settings.BASE_DIR) + "/"
+    if path.startswith(base):
+        return path[len(base):]
+    _, _, library = path.rpartition("site-packages/")
+    return library
+
+
+# =========================================================
+# STACK SAMPLER
+# =========================================================
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds
+    into collapsed "root;...;leaf" stacks.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({_where(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.join()
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# =========================================================
+# SQL
+# =========================================================
+class QueryRecorder:
+    """
+    execute_wrapper: every query with its duration and the
+    project line that issued it. Parameters are reported only
+    with `keep_params`; otherwise they are held in memory just
+    to count identical repeats.
+    """
+
+    def __init__(self, keep_params):
+        self.keep_params = keep_params
+        self.queries = []
+        self.params = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.params.append(repr(params))
+            self.queries.append({
+                "db": context["connection"].alias,
+                "sql": sql,
+                "params": self.params[-1] if self.keep_params else None,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "caller": self.caller(),
+            })
+
+    def caller(self):
+        frame = sys._getframe(2)
+        base = str(settings.BASE_DIR)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(base) and "site-packages" not in filename and filename != __file__:
+                return f"{_where(filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+        return ""
+
+    def summary(self):
+        """
+        Queries with the same SQL run more than once (N+1
+        suspects), and how many were exact repeats (same params).
+        """
+
+        similar = defaultdict(list)
+        for query, params in zip(self.queries, self.params):
+            similar[query["sql"]].append((query, params))
+
+        duplicates = [
+            {
+                "sql": sql,
+                "count": len(queries),
+                "identical_repeats": len(queries) - len({params for _, params in queries}),
+                "ms": round(sum(query["ms"] for query, _ in queries), 3),
+                "callers": sorted({query["caller"] for query, _ in queries}),
+            }
+            for sql, queries in similar.items()
+            if len(queries) > 1
+        ]
+        duplicates.sort(key=lambda duplicate: -duplicate["count"])
+
+        return {
+            "count": len(self.queries),
+            "ms": round(sum(query["ms"] for query in self.queries), 3),
+            "duplicates": duplicates,
+            "queries": self.queries,
+        }
+
+
+# =========================================================
+# TEMPLATES
+# Template.render is wrapped once; outside a profiled
+# request the wrapper only reads a context variable.
+# =========================================================
+def _instrument_templates():
+    original = Template.render
+    if getattr(original, "profiled", False):
+        return
+
+    def render(self, context):
+        timings = _template_timings.get()
+        if timings is None:
+            return original(self, context)
+
+        entry = {"name": self.origin.template_name or self.name or "<string>", "depth": timings["depth"]}
+        timings["renders"].append(entry)
+        timings["depth"] += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            entry["ms"] = round((time.perf_counter() - started) * 1000, 3)
+            timings["depth"] -= 1
+
+    render.profiled = True
+    Template.render = render
+
+
+# =========================================================
+# MIDDLEWARE
+# =========================================================
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        _instrument_templates()
+
+    def __call__(self, request):
+        mode = self.mode(request)
+        if mode is None:
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def mode(self, request):
+        """
+        "cprofile" or "sample" when asked for by staff, "random"
+        (stack samples, no SQL parameters) when picked at
+        PROFILING_SAMPLE_RATE, or None (not profiled).
+        """
+
+        requested = request.META.get(settings.PROFILING_HEADER)
+        if requested and request.user.is_staff:
+            return "cprofile" if requested.lower() == "cprofile" else "sample"
+
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "random"
+
+        return None
+
+    def profile(self, request, mode):
+        profile_id = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        recorder = QueryRecorder(keep_params=mode != "random")
+        timings = {"depth": 0, "renders": []}
+
+        if mode == "cprofile":
+            sampler, profiler = None, cProfile.Profile()
+        else:
+            sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+            profiler = None
+
+        token = _template_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+
+                if profiler:
+                    profiler.enable()
+                else:
+                    sampler.start()
+
+                response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            else:
+                sampler.stop()
+            _template_timings.reset(token)
+
+        # The body of a streaming response is produced after
+        # this returns, so the profile would miss the work
+        if response.streaming:
+            return response
+
+        elapsed = (time.perf_counter() - started) * 1000
+        try:
+            self.write(profile_id, request, response, mode, elapsed, recorder, timings, sampler, profiler)
+        except Exception:
+            logger.exception("Could not write profile %s", profile_id)
+            return response
+
+        if request.user.is_staff:
+            response["X-Profile-Id"] = profile_id
+        return response
+
+    def write(self, profile_id, request, response, mode, elapsed, recorder, timings, sampler, profiler):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        if profiler:
+            stacks_file = f"{profile_id}.prof"
+            profiler.dump_stats(directory / stacks_file)
+        else:
+            stacks_file = f"{profile_id}.folded"
+            (directory / stacks_file).write_text(sampler.folded())
+
+        match = request.resolver_match
+        report = {
+            "id": profile_id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": match.view_name if match else "",
+            "user": request.user.get_username() if request.user.is_authenticated else "",
+            "status": response.status_code,
+            "ms": round(elapsed, 3),
+            "mode": mode,
+            "stacks": stacks_file,
+            "sql": recorder.summary(),
+            "templates": timings["renders"],
+        }
+        (directory / f"{profile_id}.json").write_text(json.dumps(report, indent=2, default=str))
@@ -0,0 +1,84 @@
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+from .tenancy import current_organization_id, tenant_is_bound
+
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def read_from_replica(view_func):
+    """
+    Marks a read-only view: while it runs, ORM reads are
+    sent to the "replica" database (when one is configured).
+    Writes always go to "default".
+    """
+
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view_func(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+
+    return wrapper
+
+
+def _tenant_database():
+    """
+    Alias of the current organization's own database, if it has one.
+    """
+    if not settings.TENANT_DATABASES or not tenant_is_bound():
+        return None
+    return settings.TENANT_DATABASES.get(current_organization_id())
+
+
+# Cold storage (core.archive): settings.ARCHIVE_DATABASE, or the
+# tenant's own database (task ids are only unique per database)
+ARCHIVE_MODELS = {"archivedtask", "archivedauditlog"}
+
+
+def _is_archive(model):
+    return model._meta.model_name in ARCHIVE_MODELS
+
+
+class ReplicaRouter:
+    """
+    Routes queries made while a tenant with its own database
+    (settings.TENANT_DATABASES) is bound to that database.
+    Otherwise reads inside @read_from_replica views go to the
+    replica, and everything else (writes, auth, sessions, the
+    decision views) stays on "default".
+    Archive tables use settings.ARCHIVE_DATABASE, except for a
+    tenant with its own database, which keeps its archive there.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _is_archive(model):
+            return _tenant_database() or settings.ARCHIVE_DATABASE
+
+        tenant_db = _tenant_database()
+        if tenant_db:
+            return tenant_db
+
+        if _use_replica.get() and "replica" in settings.DATABASES:
+            return "replica"
+        return None
+
+    def db_for_write(self, model, **hints):
+        if _is_archive(model):
+            return _tenant_database() or settings.ARCHIVE_DATABASE
+        return _tenant_database() or "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name in ARCHIVE_MODELS:
+            return db == settings.ARCHIVE_DATABASE or db in settings.TENANT_DATABASES.values()
+        if db == settings.ARCHIVE_DATABASE and db != "default":
+            return False
+        return db == "default" or db in settings.TENANT_DATABASES.values()
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from django.core.cache import cache
+
+from .backends import user_cache_key
+from .delegation import clear_delegation_map
+from .models import DelegationRule, Holiday, Organization, Team, User
+from .sla import clear_calendars
+
+
+@receiver([post_save, post_delete], sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+# Cached users carry their organization and team
+@receiver([post_save, pre_delete], sender=Organization)
+@receiver([post_save, pre_delete], sender=Team)
+def drop_cached_members(sender, instance, **kwargs):
+    members = User.objects.filter(**{
+        "organization" if sender is Organization else "team": instance,
+    })
+    cache.delete_many([user_cache_key(pk) for pk in members.values_list("pk", flat=True)])
+
+
+@receiver([post_save, post_delete], sender=Organization)
+@receiver([post_save, post_delete], sender=Holiday)
+def drop_business_calendars(sender, **kwargs):
+    clear_calendars()
+
+
+@receiver([post_save, post_delete], sender=DelegationRule)
+def drop_delegation_map(sender, instance, **kwargs):
+    clear_delegation_map(instance.organization_id)
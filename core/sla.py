@@ -0,0 +1,202 @@
+import datetime
+import time
+from bisect import bisect_left, bisect_right
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Holiday
+
+
+# =========================================================
+# BUSINESS-HOURS SLA CLOCK
+#
+# A calendar is precomputed per (organization, timezone):
+# for every local day in its range it stores the UTC instant
+# work starts, the working seconds of that day, and the
+# working seconds accumulated before it. Then:
+#
+#   working_seconds_at(t)   O(1)       (array lookup)
+#   elapsed(start, end)     O(1)
+#   cutoff(now, seconds)    O(log n)   (bisect)
+#   deadline(start, seconds) O(log n)  (bisect)
+#
+# cutoff() is the bulk path: it turns "older than N working
+# hours" into one UTC instant, so thousands of tasks are
+# bucketed by a single indexed created_at comparison.
+# =========================================================
+
+_calendars = {}   # (organization, timezone, day, version) -> (calendar, built at)
+
+# Bumped in the shared cache whenever hours or holidays change;
+# each process reads it at most every VERSION_CHECK_SECONDS
+VERSION_KEY = "sla:calendars:version"
+VERSION_CHECK_SECONDS = 5
+_version = {"value": 0, "checked_at": float("-inf")}
+
+
+def clear_calendars():
+    _calendars.clear()
+    _version["checked_at"] = float("-inf")
+
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, None)
+
+
+def _calendars_version():
+    now = time.monotonic()
+    if now - _version["checked_at"] >= VERSION_CHECK_SECONDS:
+        _version["value"] = cache.get(VERSION_KEY, 0)
+        _version["checked_at"] = now
+    return _version["value"]
+
+
+def calendar_for(organization, tz_name):
+    """
+    Memoized per process for (organization, timezone, day).
+    A change to working hours or holidays (core.signals) reaches
+    other processes through the version in the shared cache;
+    without one, calendars are rebuilt every SLA_CALENDAR_MAX_AGE.
+    """
+
+    today = timezone.now().date()
+    version = _calendars_version()
+    key = (organization.pk if organization else None, tz_name, today, version)
+
+    entry = _calendars.get(key)
+    if entry is None or time.monotonic() - entry[1] > settings.SLA_CALENDAR_MAX_AGE:
+        # A new day or version: drop the old calendars (long-running daemons)
+        for stale in [k for k in _calendars if k[2:] != (today, version)]:
+            del _calendars[stale]
+
+        entry = _calendars[key] = (BusinessCalendar(organization, tz_name, today), time.monotonic())
+
+    return entry[0]
+
+
+class BusinessCalendar:
+
+    def __init__(self, organization, tz_name, today):
+        try:
+            self.tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            self.tz = ZoneInfo(settings.TIME_ZONE)
+
+        if organization:
+            work_start = organization.work_start
+            work_end = organization.work_end
+            work_days = {int(day) for day in organization.work_days.split(",") if day.strip()}
+            holidays = set(Holiday.objects.filter(organization=organization).values_list("date", flat=True))
+        else:
+            work_start = datetime.time(9, 0)
+            work_end = datetime.time(18, 0)
+            work_days = {0, 1, 2, 3, 4}
+            holidays = set()
+
+        self.first_day = today - datetime.timedelta(days=settings.SLA_CALENDAR_DAYS_BACK)
+        days = settings.SLA_CALENDAR_DAYS_BACK + settings.SLA_CALENDAR_DAYS_AHEAD
+
+        self.day_start = []     # UTC instant work starts, per local day
+        self.day_seconds = []   # working seconds of that day
+        self.cumulative = []    # working seconds before that day
+
+        # Working days only, for the inverse lookup in cutoff()
+        self.work_index = []
+        self.work_cumulative = []
+
+        total = 0
+        for offset in range(days):
+            day = self.first_day + datetime.timedelta(days=offset)
+            start = datetime.datetime.combine(day, work_start, self.tz)
+            end = datetime.datetime.combine(day, work_end, self.tz)
+
+            seconds = 0
+            if day.weekday() in work_days and day not in holidays:
+                seconds = max(0, int((end - start).total_seconds()))
+
+            self.day_start.append(start)
+            self.day_seconds.append(seconds)
+            self.cumulative.append(total)
+
+            if seconds:
+                self.work_index.append(offset)
+                self.work_cumulative.append(total)
+
+            total += seconds
+
+        # Length of a normal working day (for "N working days")
+        self.working_day = max(self.day_seconds) if any(self.day_seconds) else 8 * 3600
+
+    # -----------------------------------------------------
+    def working_seconds_at(self, moment):
+        """
+        Working seconds between the start of the calendar and `moment`.
+        """
+
+        offset = (moment.astimezone(self.tz).date() - self.first_day).days
+
+        if offset < 0:
+            return 0
+        if offset >= len(self.day_start):
+            return self.cumulative[-1] + self.day_seconds[-1]
+
+        into_day = (moment - self.day_start[offset]).total_seconds()
+        return self.cumulative[offset] + min(max(into_day, 0), self.day_seconds[offset])
+
+    def elapsed(self, start, end):
+        """
+        Working seconds between two instants.
+        """
+        return max(0, self.working_seconds_at(end) - self.working_seconds_at(start))
+
+    def cutoff(self, now, seconds):
+        """
+        The latest instant T such that anything created at or
+        before T has at least `seconds` of working time by `now`.
+        """
+
+        target = self.working_seconds_at(now) - seconds
+
+        if target < 0 or not self.work_index:
+            return self.day_start[0]
+
+        i = bisect_right(self.work_cumulative, target) - 1
+        offset = self.work_index[i]
+        into_day = target - self.work_cumulative[i]
+
+        if into_day < self.day_seconds[offset]:
+            return self.day_start[offset] + datetime.timedelta(seconds=into_day)
+
+        # Target is the end of a working day: the clock stands
+        # still until the next working day begins
+        if i + 1 < len(self.work_index):
+            return self.day_start[self.work_index[i + 1]]
+        return now
+
+    def deadline(self, start, seconds):
+        """
+        The earliest instant by which `seconds` of working time
+        have passed since `start` (None if beyond the calendar).
+        """
+
+        target = self.working_seconds_at(start) + seconds
+
+        if target <= 0:
+            return start
+
+        j = bisect_left(self.work_cumulative, target)
+
+        if j == 0:
+            return start
+
+        offset = self.work_index[j - 1]
+        into_day = target - self.work_cumulative[j - 1]
+
+        if into_day <= self.day_seconds[offset]:
+            return max(start, self.day_start[offset] + datetime.timedelta(seconds=into_day))
+
+        return None
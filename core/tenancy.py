@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import models
+
+
+# Organization id the current request runs for.
+# _UNBOUND (not None) means "no tenant context at all", e.g. a
+# management command; None is a real tenant: users without one.
+_UNBOUND = object()
+_current_organization = ContextVar("current_organization", default=_UNBOUND)
+
+
+@contextmanager
+def use_tenant(organization_id):
+    """
+    Binds every tenant-scoped query inside the block
+    to one organization.
+    """
+
+    token = _current_organization.set(organization_id)
+    try:
+        yield
+    finally:
+        _current_organization.reset(token)
+
+
+def each_database():
+    """
+    For background jobs: yields None with no tenant bound (the
+    shared database), then the id of every organization with
+    its own database (settings.TENANT_DATABASES), bound for as
+    long as the loop body runs. Everything the body does for
+    that organization is routed to its database.
+    """
+
+    yield None
+
+    for organization_id in settings.TENANT_DATABASES:
+        with use_tenant(organization_id):
+            yield organization_id
+
+
+def tenant_is_bound():
+    return _current_organization.get() is not _UNBOUND
+
+
+def current_organization_id():
+    organization_id = _current_organization.get()
+
+    if organization_id is _UNBOUND:
+        raise RuntimeError(
+            "Tenant-scoped query outside a tenant context. "
+            "Use Model.objects for global access or wrap the call in use_tenant()."
+        )
+
+    return organization_id
+
+
+# =========================================================
+# MANAGERS
+# =========================================================
+class TenantManager(models.Manager):
+    """
+    `Model.tenant`: every queryset is already filtered to the
+    current organization, so it only ever touches (and, through
+    the organization-leading indexes, only scans) that tenant's rows.
+    `Model.objects` stays global for admin, auth and commands.
+    """
+
+    organization_field = "organization"
+
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            **{f"{self.organization_field}_id": current_organization_id()}
+        )
+
+
+class TenantMiddleware:
+    """
+    Binds the logged-in user's organization for the rest of the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, "user", None)
+
+        if user is None or not user.is_authenticated:
+            return self.get_response(request)
+
+        with use_tenant(user.organization_id):
+            return self.get_response(request)
@@ -0,0 +1,174 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .models import (
+    ApprovalStep, ApprovalTask, AuditLog, Organization, TaskConflict, User, Workflow, WorkflowStage,
+)
+
+
+class ApprovalTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name="Acme", domain="acme.test")
+        cls.requester = cls.user("requester", "EMPLOYEE")
+        cls.manager = cls.user("manager", "MANAGER")
+
+    @classmethod
+    def user(cls, username, role):
+        return User.objects.create_user(username, f"{username}@acme.test", "pw", role=role, organization=cls.organization)
+
+    def decide(self, user, task, approve=True, comment="ok"):
+        self.client.force_login(user)
+        return self.client.post(f"/{'approve' if approve else 'reject'}/{task.id}/", {"comment": comment})
+
+
+# =========================================================
+# OPTIMISTIC CONCURRENCY
+# =========================================================
+class TaskConcurrencyTests(ApprovalTestCase):
+
+    def setUp(self):
+        self.task = ApprovalTask.objects.create(title="Laptop", requester=self.requester, approver=self.manager)
+
+    def test_stale_version_is_refused(self):
+        stale = ApprovalTask.objects.get(pk=self.task.pk)
+        self.task.apply(urgency="HIGH")
+
+        with self.assertRaises(TaskConflict):
+            stale.apply(status="APPROVED")
+
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "PENDING")
+        self.assertEqual(self.task.version, stale.version + 1)
+
+    def test_stale_version_gets_a_409(self):
+        stale = ApprovalTask.objects.get(pk=self.task.pk)
+        ApprovalTask.objects.get(pk=self.task.pk).apply(urgency="HIGH")
+
+        # The view loaded the task just before someone else changed it
+        with mock.patch("core.views.get_object_or_404", return_value=stale):
+            response = self.decide(self.manager, self.task)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(ApprovalTask.objects.get(pk=self.task.pk).status, "PENDING")
+        self.assertFalse(AuditLog.objects.filter(task=self.task, action="APPROVED").exists())
+
+    def test_illegal_transition_is_refused(self):
+        with self.assertRaises(TaskConflict):
+            self.task.apply(status="PENDING")
+
+        self.task.apply(status="REJECTED")
+        with self.assertRaises(TaskConflict):
+            self.task.apply(status="APPROVED")
+
+        self.assertEqual(ApprovalTask.objects.get(pk=self.task.pk).status, "REJECTED")
+
+    def test_double_approve_is_refused(self):
+        self.assertEqual(self.decide(self.manager, self.task).status_code, 302)
+        self.assertEqual(self.decide(self.manager, self.task).status_code, 409)
+
+        self.assertEqual(AuditLog.objects.filter(task=self.task, action="APPROVED").count(), 1)
+
+
+# =========================================================
+# WORKFLOW ENGINE
+# =========================================================
+class WorkflowTests(ApprovalTestCase):
+
+    def setUp(self):
+        self.first = [self.user(f"all{i}", "MANAGER") for i in range(2)]
+        self.second = [self.user(f"any{i}", "MANAGER") for i in range(2)]
+
+        workflow = Workflow.objects.create(name="Purchases", organization=self.organization)
+        WorkflowStage.objects.create(workflow=workflow, order=1, rule="ALL").approvers.set(self.first)
+        WorkflowStage.objects.create(workflow=workflow, order=2, rule="ANY").approvers.set(self.second)
+
+        self.client.force_login(self.requester)
+        self.client.post("/create/", {"title": "Server", "urgency": "NORMAL", "approver": "", "workflow": workflow.id})
+        self.task = ApprovalTask.objects.get(title="Server")
+
+    def steps(self, stage):
+        return dict(
+            ApprovalStep.objects.filter(task=self.task, stage=stage)
+            .values_list("approver__username", "status")
+        )
+
+    def test_all_stage_waits_for_every_approver(self):
+        self.assertEqual(self.steps(1), {"any0": "WAITING", "any1": "WAITING"})
+
+        self.decide(self.first[0], self.task)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.current_stage), ("PENDING", 0))
+
+        self.decide(self.first[1], self.task)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.current_stage), ("PENDING", 1))
+        self.assertEqual(self.steps(1), {"any0": "PENDING", "any1": "PENDING"})
+
+    def test_any_stage_finishes_on_the_first_approval(self):
+        for user in self.first:
+            self.decide(user, self.task)
+
+        self.decide(self.second[1], self.task)
+        self.task.refresh_from_db()
+
+        self.assertEqual(self.task.status, "APPROVED")
+        self.assertEqual(self.steps(1), {"any0": "SKIPPED", "any1": "APPROVED"})
+        # The stage is closed: the other approver has nothing left to decide
+        self.assertEqual(self.decide(self.second[0], self.task).status_code, 403)
+
+    def test_rejection_in_an_all_stage_rejects_the_task(self):
+        self.decide(self.first[0], self.task, approve=False, comment="too expensive")
+        self.task.refresh_from_db()
+
+        self.assertEqual(self.task.status, "REJECTED")
+        self.assertEqual(self.steps(1), {"any0": "SKIPPED", "any1": "SKIPPED"})
+
+    def test_an_approver_decides_a_stage_once(self):
+        self.decide(self.first[0], self.task)
+
+        self.assertEqual(self.decide(self.first[0], self.task).status_code, 403)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.stage_approved, 1)
+
+
+# =========================================================
+# AUDIT HASH CHAIN
+# =========================================================
+class AuditChainTests(ApprovalTestCase):
+
+    def setUp(self):
+        self.task = ApprovalTask.objects.create(title="Laptop", requester=self.requester, approver=self.manager)
+        AuditLog.objects.create(task=self.task, action="CREATED", performed_by=self.requester)
+        self.decide(self.manager, self.task)
+
+    def verify(self):
+        call_command("verify_audit_chain", "--workers", "1", stdout=StringIO())
+
+    def test_untouched_chain_verifies(self):
+        self.verify()
+
+    def test_edited_entry_is_detected(self):
+        AuditLog.objects.filter(task=self.task, action="APPROVED").update(remarks="Approved without comment")
+
+        with self.assertRaisesMessage(CommandError, "1 task chain(s) broken"):
+            self.verify()
+
+    def test_removed_entry_is_detected(self):
+        AuditLog.objects.filter(task=self.task, action="CREATED").delete()
+
+        with self.assertRaisesMessage(CommandError, "1 task chain(s) broken"):
+            self.verify()
+
+    def test_deleting_a_user_keeps_the_chain(self):
+        admin = self.user("admin", "ADMIN")
+        AuditLog.objects.create(task=self.task, action="REMINDER", performed_by=admin)
+        admin.delete()
+
+        self.assertTrue(AuditLog.objects.filter(task=self.task, action="REMINDER", performed_by=None).exists())
+        self.verify()
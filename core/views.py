@@ -2,10 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.http import HttpResponseForbidden
-
-from .models import ApprovalTask, AuditLog, User
-from .utils import send_notification_email
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Count, Q
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+import hashlib
+from functools import partial
+
+from .analytics import report
+from .archive import find_task, search_tasks, timeline
+from .delegation import delegation_map
+from .idempotency import idempotent
+from .models import (
+    ApprovalStep, ApprovalTask, AuditLog, DecisionRollup, Inbox, Notification, TaskConflict, User, Workflow,
+)
+from .routers import read_from_replica
+from .sla import calendar_for
+from .notifications import mark_all_read, notify, recent, unread_count
+from .workflow import build_plan, create_steps, record_decision
 
 
 # =========================================================
@@ -53,7 +70,49 @@ def logout_view(request):
 # DASHBOARD
 # =========================================================
 
+def _row_keys(tasks, template_name):
+    """
+    One cache key per row, from (task id, updated_at, the
+    usernames shown): a single narrow query, no rendering.
+    """
+
+    return {
+        task_id: f"{template_name}:{task_id}:{updated_at.timestamp()}:{requester}:{approver}"
+        for task_id, updated_at, requester, approver in tasks.values_list(
+            "id", "updated_at", "requester__username", "approver__username"
+        )
+    }
+
+
+def _table_key(keys):
+    # Any row key changing (or a row coming / going) changes the table key
+    return hashlib.md5("|".join(keys.values()).encode()).hexdigest()
+
+
+def _render_rows(tasks, template_name, keys):
+    """
+    Renders one table row per task.
+    Full rows are fetched and rendered just for the keys
+    the cache does not have.
+    """
+
+    rows = cache.get_many(keys.values())
+
+    missing_ids = [task_id for task_id, key in keys.items() if key not in rows]
+    if missing_ids:
+        template = get_template(template_name)
+        missing = {
+            keys[task.id]: template.render({"task": task})
+            for task in tasks.filter(id__in=missing_ids)
+        }
+        cache.set_many(missing, settings.DASHBOARD_ROW_CACHE_SECONDS)
+        rows.update(missing)
+
+    return mark_safe("".join(rows.get(key, "") for key in keys.values()))
+
+
 @login_required
+@read_from_replica
 def dashboard(request):
     """
     Main dashboard.
@@ -69,42 +128,69 @@ def dashboard(request):
     # ---------------------------------------------
     # Approvals ASSIGNED to this user (pending)
     # ---------------------------------------------
-    assigned_tasks = ApprovalTask.objects.filter(
-        approver=user,
-        status="PENDING"
+    # (single-approver tasks, plus multi-level tasks
+    # where one of the user's steps is open, plus tasks
+    # delegated to the user by someone who is away)
+    assigned = (
+        Q(approver=user, stage_plan=[]) |
+        Q(id__in=ApprovalStep.objects.actionable_for(user).values("task_id"))
     )
 
+    delegated = delegation_map(user.organization_id).delegated_to(user.pk)
+    if delegated is not None:
+        assigned |= delegated
+
+    assigned_tasks = ApprovalTask.tenant.filter(
+        assigned,
+        status="PENDING"
+    ).select_related("requester")
+
     # ---------------------------------------------
     # Approvals CREATED by this user
     # ---------------------------------------------
-    created_tasks = ApprovalTask.objects.filter(
+    created_tasks = ApprovalTask.tenant.filter(
         requester=user
-    )
+    ).select_related("approver")
 
     # ---------------------------------------------
     # SLA BUCKET CALCULATION
+    # Working time in the user's timezone (organization
+    # hours and holidays): the business calendar turns
+    # "1 / 2 working days old" into two created_at cutoffs
+    # and the database counts each bucket.
     # ---------------------------------------------
-    sla_green = []
-    sla_yellow = []
-    sla_red = []
+    calendar = calendar_for(user.organization, user.timezone)
+    day_ago = calendar.cutoff(now, calendar.working_day)
+    two_days_ago = calendar.cutoff(now, 2 * calendar.working_day)
+
+    assigned_summary = assigned_tasks.aggregate(
+        total=Count("id"),
+        green=Count("id", filter=Q(created_at__gt=day_ago)),
+        yellow=Count("id", filter=Q(created_at__lte=day_ago, created_at__gt=two_days_ago)),
+        red=Count("id", filter=Q(created_at__lte=two_days_ago)),
+    )
 
-    for task in assigned_tasks:
-        hours_passed = (now - task.created_at).total_seconds() / 3600
-
-        if hours_passed < 24:
-            sla_green.append(task)
-        elif hours_passed < 48:
-            sla_yellow.append(task)
-        else:
-            sla_red.append(task)
+    # Row keys also key the table caches: while none of
+    # them changed the rows are never fetched or rendered.
+    assigned_keys = _row_keys(assigned_tasks, "partials/assigned_row.html")
+    created_keys = _row_keys(created_tasks, "partials/created_row.html")
 
     return render(request, "dashboard.html", {
         "user": user,
         "assigned_tasks": assigned_tasks,
         "created_tasks": created_tasks,
-        "sla_green": sla_green,
-        "sla_yellow": sla_yellow,
-        "sla_red": sla_red,
+        "assigned_summary": assigned_summary,
+        "created_total": len(created_keys),
+        "assigned_table_key": _table_key(assigned_keys),
+        "created_table_key": _table_key(created_keys),
+        "sla_green": assigned_summary["green"],
+        "sla_yellow": assigned_summary["yellow"],
+        "sla_red": assigned_summary["red"],
+        "unread_notifications": unread_count(user),
+        "row_cache_timeout": settings.DASHBOARD_ROW_CACHE_SECONDS,
+        # Callables: only evaluated when the table cache misses.
+        "assigned_rows": partial(_render_rows, assigned_tasks, "partials/assigned_row.html", assigned_keys),
+        "created_rows": partial(_render_rows, created_tasks, "partials/created_row.html", created_keys),
     })
 
 
@@ -113,6 +199,7 @@ def dashboard(request):
 # =========================================================
 
 @login_required
+@idempotent
 def create_approval(request):
     """
     Allows any logged-in user (employee/manager/admin)
@@ -123,18 +210,50 @@ def create_approval(request):
         title = request.POST.get("title")
         urgency = request.POST.get("urgency")
         approver_id = request.POST.get("approver")
+        workflow_id = request.POST.get("workflow")
+
+        stage_plan = []
+        stage_approvers = []
+
+        # Approvers who are away are replaced by their delegates
+        delegations = delegation_map(request.user.organization_id)
+
+        def route(user_id):
+            return delegations.resolve(user_id, urgency, request.user.team_id)
 
-        # Validate approver
-        approver = get_object_or_404(User, id=approver_id)
+        if workflow_id:
+            # Multi-level: the workflow decides who approves
+            workflow = get_object_or_404(Workflow.tenant, id=workflow_id)
+            try:
+                stage_plan, stage_approvers = build_plan(workflow, route)
+            except ValueError as exc:
+                return HttpResponseBadRequest(str(exc))
+            approver = stage_approvers[0][0]
+        else:
+            workflow = None
+
+            # Validate approver
+            approver = get_object_or_404(User.tenant, id=approver_id)
+
+            delegate_id = route(approver.id)
+            if delegate_id != approver.id:
+                # A delegate outside this organization is never used
+                approver = User.tenant.filter(id=delegate_id).first() or approver
 
         # Create approval task
-        approval = ApprovalTask.objects.create(
-            title=title,
-            requester=request.user,
-            approver=approver,
-            urgency=urgency,
-            status="PENDING"
-        )
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            approval = ApprovalTask.objects.create(
+                title=title,
+                requester=request.user,
+                approver=approver,
+                urgency=urgency,
+                status="PENDING",
+                workflow=workflow,
+                stage_plan=stage_plan
+            )
+
+            if workflow:
+                create_steps(approval, stage_approvers)
 
         # Audit log
         AuditLog.objects.create(
@@ -143,12 +262,15 @@ def create_approval(request):
             performed_by=request.user
         )
 
-        # Email notification to approver
-        if approver.email:
-            send_notification_email(
-                subject="New Approval Request",
-                message=f"""
-Hello {approver.username},
+        # Notify the approver(s) of the first stage
+        notify(
+            "REQUEST",
+            approval,
+            stage_approvers[0] if stage_approvers else [approver],
+            f"New request from {request.user.username}: {approval.title}",
+            subject="New Approval Request",
+            message=f"""
+Hello,
 
 A new approval request has been created.
 
@@ -158,56 +280,162 @@ Urgency: {approval.urgency}
 
 Please log in to review.
 """,
-                recipient_list=[approver.email]
-            )
+        )
 
         return redirect("dashboard")
 
-    # Only MANAGER or ADMIN can be selected as approver
-    approvers = User.objects.filter(role__in=["MANAGER", "ADMIN"])
+    # Only MANAGER or ADMIN of the same organization
+    # can be selected as approver
+    approvers = User.tenant.filter(role__in=["MANAGER", "ADMIN"])
 
     return render(request, "create_approval.html", {
-        "approvers": approvers
+        "approvers": approvers,
+        "workflows": Workflow.tenant.all(),
     })
 
 
+def _conflict(exc):
+    """
+    Clean response for a decision that lost a race.
+    """
+    return HttpResponse(
+        f"{exc}. Reload the dashboard to see its current state.",
+        status=409,
+    )
+
+
+def _decide_step(request, task, approved, comment):
+    """
+    Decision on a multi-level task: the user decides their own
+    open step and the workflow engine moves the task along.
+    """
+
+    step = ApprovalStep.objects.actionable_for(request.user).filter(task=task).first()
+
+    if step is None:
+        return HttpResponseForbidden("You have no open step on this task")
+
+    try:
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            outcome = record_decision(step, approved)
+
+            AuditLog.objects.create(
+                task=task,
+                action="APPROVED" if approved else "REJECTED",
+                performed_by=request.user,
+                remarks=f"[Stage {step.stage + 1}] {comment or 'No comment provided'}"
+            )
+    except TaskConflict as exc:
+        return _conflict(exc)
+
+    if outcome == "ADVANCED":
+        # Next stage opened: one notification per approver, one insert
+        recipients = [
+            step.approver for step in
+            ApprovalStep.objects.filter(task=task, status="PENDING").select_related("approver")
+        ]
+        notify(
+            "REQUEST",
+            task,
+            recipients,
+            f"\"{task.title}\" has reached your stage",
+            subject="New Approval Request",
+            message=f"""
+Hello,
+
+The approval request "{task.title}" has reached your stage.
+Requested by: {task.requester.username}
+Urgency: {task.urgency}
+
+Please log in to review.
+""",
+        )
+
+    elif outcome:
+        notify(
+            outcome,
+            task,
+            [task.requester],
+            f"\"{task.title}\" was {outcome.lower()}",
+            subject=f"Approval {outcome.title()}",
+            message=f"""
+Hello {task.requester.username},
+
+Your approval request "{task.title}" has been {outcome}.
+
+Last comment:
+{comment if comment else "No comment provided"}
+""",
+        )
+
+    return redirect("dashboard")
+
+
+def _acts_for(user, task):
+    """
+    The approver, or whoever their delegation routes the task to.
+    """
+    if task.approver_id == user.pk:
+        return True
+    return delegation_map(task.organization_id).for_task(task) == user.pk
+
+
+def _decision_comment(request, task_id):
+    """
+    Reads the decision comment.
+    The dashboard posts every row through one shared form,
+    so the field is named per task ("comment-<id>").
+    """
+    comment = request.POST.get("comment") or request.POST.get(f"comment-{task_id}", "")
+    return comment.strip()
+
+
 # =========================================================
 # APPROVE TASK
 # =========================================================
 
 @login_required
+@idempotent
 def approve_task(request, task_id):
     """
     Allows the assigned approver to approve a task
     with an optional comment.
     """
 
-    task = get_object_or_404(ApprovalTask, id=task_id)
+    task = get_object_or_404(ApprovalTask.tenant, id=task_id)
+    comment = _decision_comment(request, task_id)
+
+    if task.stage_plan:
+        return _decide_step(request, task, approved=True, comment=comment)
 
     # Authorization check
-    if task.approver != request.user:
+    if not _acts_for(request.user, task):
         return HttpResponseForbidden("You are not authorized to approve this task")
 
-    comment = request.POST.get("comment", "").strip()
-
-    # Update task
-    task.status = "APPROVED"
-    task.updated_at = timezone.now()
-    task.save()
-
-    # Audit log
-    AuditLog.objects.create(
-        task=task,
-        action="APPROVED",
-        performed_by=request.user,
-        remarks=comment if comment else "Approved without comment"
-    )
-
-    # Email requester
-    if task.requester.email:
-        send_notification_email(
-            subject="Approval Approved",
-            message=f"""
+    # Update task: only if it is still PENDING and unchanged
+    # since it was loaded (no row lock; losers get a 409)
+    try:
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            task.apply(status="APPROVED")
+
+            # Audit log
+            AuditLog.objects.create(
+                task=task,
+                action="APPROVED",
+                performed_by=request.user,
+                remarks=comment if comment else "Approved without comment"
+            )
+    except TaskConflict as exc:
+        return _conflict(exc)
+
+    # Notify requester
+    notify(
+        "APPROVED",
+        task,
+        [task.requester],
+        f"\"{task.title}\" was approved by {request.user.username}",
+        subject="Approval Approved",
+        message=f"""
 Hello {task.requester.username},
 
 Your approval request "{task.title}" has been APPROVED.
@@ -215,8 +443,7 @@ Your approval request "{task.title}" has been APPROVED.
 Comment:
 {comment if comment else "No comment provided"}
 """,
-            recipient_list=[task.requester.email]
-        )
+    )
 
     return redirect("dashboard")
 
@@ -226,41 +453,50 @@ Comment:
 # =========================================================
 
 @login_required
+@idempotent
 def reject_task(request, task_id):
     """
     Allows the assigned approver to reject a task.
     Rejection MUST include a reason.
     """
 
-    task = get_object_or_404(ApprovalTask, id=task_id)
-
-    # Authorization check
-    if task.approver != request.user:
-        return HttpResponseForbidden("You are not authorized to reject this task")
-
-    comment = request.POST.get("comment", "").strip()
+    task = get_object_or_404(ApprovalTask.tenant, id=task_id)
+    comment = _decision_comment(request, task_id)
 
     if not comment:
         return HttpResponseForbidden("Rejection requires a reason")
 
-    # Update task
-    task.status = "REJECTED"
-    task.updated_at = timezone.now()
-    task.save()
+    if task.stage_plan:
+        return _decide_step(request, task, approved=False, comment=comment)
 
-    # Audit log
-    AuditLog.objects.create(
-        task=task,
-        action="REJECTED",
-        performed_by=request.user,
-        remarks=comment
-    )
+    # Authorization check
+    if not _acts_for(request.user, task):
+        return HttpResponseForbidden("You are not authorized to reject this task")
 
-    # Email requester
-    if task.requester.email:
-        send_notification_email(
-            subject="Approval Rejected",
-            message=f"""
+    # Update task: only if it is still PENDING and unchanged
+    # since it was loaded (no row lock; losers get a 409)
+    try:
+        with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+            task.apply(status="REJECTED")
+
+            # Audit log
+            AuditLog.objects.create(
+                task=task,
+                action="REJECTED",
+                performed_by=request.user,
+                remarks=comment
+            )
+    except TaskConflict as exc:
+        return _conflict(exc)
+
+    # Notify requester
+    notify(
+        "REJECTED",
+        task,
+        [task.requester],
+        f"\"{task.title}\" was rejected by {request.user.username}",
+        subject="Approval Rejected",
+        message=f"""
 Hello {task.requester.username},
 
 Your approval request "{task.title}" has been REJECTED.
@@ -268,8 +504,7 @@ Your approval request "{task.title}" has been REJECTED.
 Reason:
 {comment}
 """,
-            recipient_list=[task.requester.email]
-        )
+    )
 
     return redirect("dashboard")
 
@@ -279,19 +514,20 @@ Reason:
 # =========================================================
 
 @login_required
+@idempotent
 def snooze_task(request, task_id, hours):
     """
     Allows approver to snooze a task for N hours.
     Snoozed tasks are skipped by reminder job.
     """
 
-    task = get_object_or_404(ApprovalTask, id=task_id)
+    task = get_object_or_404(ApprovalTask.tenant, id=task_id)
 
-    if task.approver != request.user:
+    if not _acts_for(request.user, task):
         return HttpResponseForbidden("You are not authorized to snooze this task")
 
     task.snooze_until = timezone.now() + timezone.timedelta(hours=hours)
-    task.save()
+    task.save(update_fields=["snooze_until", "updated_at"])
 
     AuditLog.objects.create(
         task=task,
@@ -308,25 +544,125 @@ def snooze_task(request, task_id, hours):
 # =========================================================
 
 @login_required
+@read_from_replica
 def audit_timeline(request, task_id):
     """
     Shows full lifecycle of an approval.
-    Visible to requester, approver, or admin only.
+    Visible to requester, approver (or their delegate), workflow approvers, or admin only.
     """
 
-    task = get_object_or_404(ApprovalTask, id=task_id)
+    # Finished tasks may have been archived: look there too
+    task, archived = find_task(task_id, include_archive=True)
+    if task is None:
+        raise Http404("No such approval")
 
-    # Authorization
+    # Authorization (delegates see the tasks their dashboard lists)
     if (
-        request.user != task.requester and
-        request.user != task.approver and
-        request.user.role != "ADMIN"
+        request.user.pk != task.requester_id and
+        request.user.pk != task.approver_id and
+        request.user.role != "ADMIN" and
+        (archived or not (_acts_for(request.user, task) or task.steps.filter(approver=request.user).exists()))
     ):
         return HttpResponseForbidden("You are not allowed to view this audit")
 
-    logs = AuditLog.objects.filter(task=task).order_by("timestamp")
-
     return render(request, "audit_timeline.html", {
         "task": task,
-        "logs": logs
+        "archived": archived,
+        "logs": timeline(task, archived),
     })
+
+
+# =========================================================
+# SEARCH
+# =========================================================
+
+@login_required
+@read_from_replica
+def search_view(request):
+    """
+    Title search over the user's own approvals.
+    The archive is only searched when asked for.
+    """
+
+    query = request.GET.get("q", "").strip()
+    include_archive = request.GET.get("archive") == "1"
+
+    return render(request, "search.html", {
+        "query": query,
+        "include_archive": include_archive,
+        "results": search_tasks(request.user, query, include_archive) if query else [],
+    })
+
+
+# =========================================================
+# SLA ANALYTICS
+# =========================================================
+
+@login_required
+@read_from_replica
+def analytics_report(request):
+    """
+    Time-to-decision (median / p95) and SLA breaches per team
+    or approver, merged from the hourly / daily rollups.
+    Managers and admins only.
+    """
+
+    if request.user.role not in ("MANAGER", "ADMIN"):
+        return HttpResponseForbidden("Analytics are for managers and admins")
+
+    try:
+        days = max(1, min(int(request.GET.get("days", 30)), 365))
+    except ValueError:
+        days = 30
+
+    group_by = "approver" if request.GET.get("group_by") == "approver" else "team"
+
+    # Short windows read hourly rows, longer ones daily rows
+    granularity = "HOUR" if days <= 2 else "DAY"
+    since = timezone.now() - timezone.timedelta(days=days)
+    if granularity == "DAY":
+        since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rollups = DecisionRollup.tenant.filter(
+        granularity=granularity,
+        bucket_start__gte=since,
+    ).select_related("team", "approver")
+
+    return render(request, "analytics.html", {
+        "rows": report(rollups, group_by),
+        "days": days,
+        "group_by": group_by,
+    })
+
+
+# =========================================================
+# NOTIFICATIONS
+# =========================================================
+
+@login_required
+def notifications_view(request):
+    """
+    Inbox (latest notifications) and email preferences.
+    """
+
+    inbox, _ = Inbox.objects.get_or_create(user=request.user)
+
+    if request.method == "POST":
+        kinds = [kind for kind, _ in Notification.KIND_CHOICES if request.POST.get(f"email-{kind}")]
+        inbox.email_kinds = ",".join(kinds)
+        inbox.save(update_fields=["email_kinds"])
+        return redirect("notifications")
+
+    return render(request, "notifications.html", {
+        "notifications": recent(request.user),
+        "email_choices": [
+            (kind, label, inbox.emails(kind)) for kind, label in Notification.KIND_CHOICES
+        ],
+    })
+
+
+@login_required
+def mark_notifications_read(request):
+    if request.method == "POST":
+        mark_all_read(request.user)
+    return redirect("notifications")
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.core.cache import caches
+from django.db import connections
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+
+# =========================================================
+# PROCESS WARMUP
+# Work every worker would otherwise do on its first request.
+# With gunicorn's preload_app it runs once in the master and
+# the workers inherit the result through fork().
+# =========================================================
+
+def warm_up():
+    """
+    Builds the URL resolver and compiles every app template.
+    Returns (url patterns, templates) loaded.
+    """
+
+    resolver = get_resolver()
+    resolver._populate()  # reverse() / resolve() lookup tables
+
+    templates = 0
+    for engine in engines.all():
+        for config in apps.get_app_configs():
+            directory = Path(config.path) / "templates"
+            for path in directory.rglob("*.html"):
+                # Compiled once into the cached template loader
+                get_template(str(path.relative_to(directory)), using=engine.name)
+                templates += 1
+
+    return len(resolver.reverse_dict), templates
+
+
+def release_connections():
+    """
+    Closes DB and cache connections. Sockets must never be
+    shared across fork(): two processes would read each
+    other's replies.
+    """
+
+    connections.close_all()
+    caches.close_all()
+
+
+def open_connections():
+    """
+    Connects to every configured database up front, so the
+    first request does not pay for the handshake.
+    """
+
+    for connection in connections.all():
+        connection.ensure_connection()
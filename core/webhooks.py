@@ -0,0 +1,432 @@
+import asyncio
+import hashlib
+import hmac
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analytics import SAFETY_LAG
+from .models import AnalyticsCursor, AuditLog, WebhookDelivery, WebhookEndpoint
+
+
+# =========================================================
+# WEBHOOK DELIVERY
+#
+#   1. fan_out()  audit log → one outbox row per subscribed
+#                 endpoint (cursor + chunked, like the rollups)
+#   2. deliver()  claims due rows, POSTs them concurrently over
+#                 pooled keep-alive connections, records results
+#
+# Both run in the deliver_webhooks worker, never in a request.
+# =========================================================
+
+MAX_ATTEMPTS = 8
+
+# Retry n waits BACKOFF_BASE * 2^(n-1), capped, with jitter
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=6)
+
+# Consecutive failures that open an endpoint's circuit
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = timedelta(minutes=5)
+
+# Claimed rows are invisible to other workers this long
+CLAIM_LEASE = timedelta(minutes=2)
+
+# Requests in flight per endpoint, so one slow receiver
+# cannot take every worker slot
+PER_ENDPOINT_CONCURRENCY = 2
+
+# Batches claimed per endpoint and round: what an endpoint
+# timing out on every request still gets through in half
+# the lease, so a slow receiver cannot outlive the claim
+MAX_BATCHES_PER_ENDPOINT = PER_ENDPOINT_CONCURRENCY * max(
+    1, int(CLAIM_LEASE.total_seconds() / 2 // settings.WEBHOOK_TIMEOUT_SECONDS),
+)
+
+# _send_all() result of a batch not sent because its
+# endpoint's circuit opened during the round
+SKIPPED = "skipped"
+
+
+def event_payload(log):
+    return {
+        "id": log.id,
+        "event": log.action,
+        "timestamp": log.timestamp.isoformat(),
+        "organization_id": log.organization_id,
+        "performed_by": log.performed_by.username if log.performed_by else None,
+        "remarks": log.remarks,
+        "task": {
+            "id": log.task_id,
+            "title": log.task.title,
+            "status": log.task.status,
+            "urgency": log.task.urgency,
+        },
+    }
+
+
+def sign(secret, timestamp, body):
+    """
+    HMAC-SHA256 over "<timestamp>.<body>"; receivers recompute it
+    and reject old timestamps to stop replays.
+    """
+
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+# =========================================================
+# 1. FAN-OUT
+# =========================================================
+def fan_out(chunk_size=1000, cursor_name="webhooks"):
+    """
+    Turns new audit events into deliveries and returns the
+    number of audit rows read.
+    """
+
+    cursor, _ = AnalyticsCursor.objects.get_or_create(name=cursor_name)
+    horizon = timezone.now() - SAFETY_LAG
+    processed = 0
+
+    while True:
+        logs = list(
+            AuditLog.objects.filter(id__gt=cursor.last_audit_id, timestamp__lt=horizon)
+            .select_related("task", "performed_by")
+            .order_by("id")[:chunk_size]
+        )
+
+        if not logs:
+            break
+
+        endpoints = defaultdict(list)
+        for endpoint in WebhookEndpoint.objects.filter(
+            organization_id__in={log.organization_id for log in logs},
+            is_active=True,
+        ):
+            endpoints[endpoint.organization_id].append(endpoint)
+
+        deliveries = [
+            WebhookDelivery(endpoint=endpoint, audit_log=log, payload=event_payload(log))
+            for log in logs
+            for endpoint in endpoints[log.organization_id]
+            if endpoint.wants(log.action)
+        ]
+
+        # Compare-and-set: a worker that overlaps this one and
+        # took the chunk already leaves nothing to queue
+        with transaction.atomic(using=router.db_for_write(WebhookDelivery)):
+            claimed = cursor.advance(logs[-1].id)
+            if claimed:
+                WebhookDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+
+        if not claimed:
+            cursor = AnalyticsCursor.objects.get(name=cursor_name)
+            continue
+
+        processed += len(logs)
+
+        if len(logs) < chunk_size:
+            break
+
+    return processed
+
+
+# =========================================================
+# CONNECTION POOL
+# http.client connections are HTTP/1.1 keep-alive; idle ones
+# are reused per (scheme, host, port) instead of a new TCP
+# (and TLS) handshake per event.
+# =========================================================
+class ConnectionPool:
+
+    def __init__(self, timeout, max_idle=10):
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def _connect(self, key):
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def post(self, url, body, headers):
+        """
+        Returns the response status. Raises OSError /
+        http.client.HTTPException on network failures.
+        """
+
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        with self._lock:
+            connection = self._idle[key].pop() if self._idle[key] else None
+        reused = connection is not None
+
+        while True:
+            if connection is None:
+                connection = self._connect(key)
+
+            try:
+                connection.request("POST", path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if not reused:
+                    raise
+                # The server closed an idle keep-alive connection: retry once fresh
+                connection, reused = None, False
+                continue
+            except Exception:
+                connection.close()
+                raise
+
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            with self._lock:
+                if len(self._idle[key]) < self.max_idle:
+                    self._idle[key].append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+
+        return response.status
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for connection in connections:
+                    connection.close()
+            self._idle.clear()
+
+
+# =========================================================
+# 2. DELIVERY
+# =========================================================
+def _claim(limit):
+    """
+    Locks a page of due deliveries for this worker by pushing
+    next_attempt_at past the lease, at most
+    MAX_BATCHES_PER_ENDPOINT batches per endpoint; the rest of
+    the page stays due for the next round or another worker.
+    Claimed rows carry the lease in next_attempt_at.
+    """
+
+    now = timezone.now()
+    lease = now + CLAIM_LEASE
+
+    with transaction.atomic(using=router.db_for_write(WebhookDelivery)):
+        page = (
+            WebhookDelivery.objects.filter(
+                status="PENDING",
+                next_attempt_at__lte=now,
+                endpoint__is_active=True,
+            )
+            .filter(Q(endpoint__circuit_open_until__isnull=True) | Q(endpoint__circuit_open_until__lte=now))
+            .select_related("endpoint")
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("next_attempt_at")[:limit]
+        )
+
+        claimed = []
+        per_endpoint = defaultdict(int)
+        for delivery in page:
+            cap = MAX_BATCHES_PER_ENDPOINT * max(1, delivery.endpoint.batch_size)
+            if per_endpoint[delivery.endpoint_id] < cap:
+                per_endpoint[delivery.endpoint_id] += 1
+                delivery.next_attempt_at = lease
+                claimed.append(delivery)
+
+        WebhookDelivery.objects.filter(id__in=[d.id for d in claimed]).update(
+            next_attempt_at=lease,
+        )
+
+    return claimed
+
+
+def _batches(deliveries):
+    by_endpoint = defaultdict(list)
+    for delivery in deliveries:
+        by_endpoint[delivery.endpoint_id].append(delivery)
+
+    for group in by_endpoint.values():
+        size = max(1, group[0].endpoint.batch_size)
+        for start in range(0, len(group), size):
+            yield group[start:start + size]
+
+
+def _request(batch):
+    endpoint = batch[0].endpoint
+    body = json.dumps({"events": [delivery.payload for delivery in batch]}).encode()
+    timestamp = str(int(time.time()))
+
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "SmartApprovalSystem-Webhooks",
+        "X-Webhook-Timestamp": timestamp,
+        "X-Webhook-Signature": f"sha256={sign(endpoint.secret, timestamp, body)}",
+    }
+    return endpoint.url, body, headers
+
+
+async def _send_all(batches, pool, concurrency):
+    """
+    POSTs every batch; returns [(batch, error or None or SKIPPED)]
+    and {endpoint id: (any success, failures after the last
+    success)}, counted in the order the requests finished.
+
+    An endpoint whose consecutive failures reach
+    CIRCUIT_THRESHOLD gets no more requests this round; one
+    already past it (half-open) gets a single probe.
+    """
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    endpoint_slots = defaultdict(lambda: asyncio.Semaphore(PER_ENDPOINT_CONCURRENCY))
+    streaks = {}
+    outcomes = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        async def send(batch):
+            endpoint = batch[0].endpoint
+
+            async with endpoint_slots[endpoint.id], slots:
+                streak = streaks.get(endpoint.id, endpoint.consecutive_failures)
+                if endpoint.id in outcomes and streak >= CIRCUIT_THRESHOLD:
+                    return batch, SKIPPED
+                outcomes.setdefault(endpoint.id, (False, 0))
+
+                try:
+                    status = await loop.run_in_executor(executor, pool.post, *_request(batch))
+                except Exception as exception:
+                    error = f"{type(exception).__name__}: {exception}"
+                else:
+                    error = None if 200 <= status < 300 else f"HTTP {status}"
+
+            succeeded, failures = outcomes[endpoint.id]
+            if error is None:
+                streaks[endpoint.id] = 0
+                outcomes[endpoint.id] = (True, 0)
+            else:
+                streaks[endpoint.id] = streaks.get(endpoint.id, endpoint.consecutive_failures) + 1
+                outcomes[endpoint.id] = (succeeded, failures + 1)
+            return batch, error
+
+        results = await asyncio.gather(*(send(batch) for batch in batches))
+
+    return results, outcomes
+
+
+def _backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _record(results, outcomes, lease):
+    now = timezone.now()
+    delivered = []
+    failed = []
+    skipped = []
+
+    for batch, error in results:
+        for delivery in batch:
+            if error is None:
+                delivered.append(delivery.id)
+                continue
+
+            if error is SKIPPED:
+                skipped.append(delivery.id)
+                continue
+
+            delivery.attempts += 1
+            delivery.last_error = error[:1000]
+            if delivery.attempts >= MAX_ATTEMPTS:
+                delivery.status = "FAILED"
+            else:
+                delivery.next_attempt_at = now + _backoff(delivery.attempts)
+            failed.append(delivery)
+
+    with transaction.atomic(using=router.db_for_write(WebhookDelivery)):
+        # Rows whose lease ran out were claimed again by another
+        # worker; that worker's outcome is the one to keep
+        held = set(
+            WebhookDelivery.objects.select_for_update()
+            .filter(id__in=delivered + skipped + [d.id for d in failed], status="PENDING", next_attempt_at=lease)
+            .values_list("id", flat=True)
+        )
+        delivered = [delivery_id for delivery_id in delivered if delivery_id in held]
+        failed = [delivery for delivery in failed if delivery.id in held]
+
+        WebhookDelivery.objects.filter(id__in=delivered).update(
+            status="DELIVERED",
+            delivered_at=now,
+        )
+        WebhookDelivery.objects.bulk_update(
+            failed,
+            ["attempts", "last_error", "status", "next_attempt_at"],
+        )
+        # Not attempted: due again once the circuit closes
+        WebhookDelivery.objects.filter(id__in=[i for i in skipped if i in held]).update(next_attempt_at=now)
+
+        for endpoint_id, (succeeded, new_failures) in outcomes.items():
+            row = WebhookEndpoint.objects.filter(pk=endpoint_id)
+
+            if succeeded:
+                # Only failures after the last success still count
+                row.update(consecutive_failures=new_failures)
+                if not new_failures:
+                    row.update(circuit_open_until=None)
+                    continue
+            else:
+                # Incremented in the database: other workers' failures
+                # of the same endpoint add up instead of overwriting
+                row.update(consecutive_failures=F("consecutive_failures") + new_failures)
+
+            failures = row.values_list("consecutive_failures", flat=True).get()
+
+            if failures >= CIRCUIT_THRESHOLD:
+                # Half-open after the cooldown: the next round
+                # sends one probe; failing again doubles it
+                trips = failures - CIRCUIT_THRESHOLD
+                row.update(circuit_open_until=now + min(CIRCUIT_COOLDOWN * 2 ** trips, BACKOFF_MAX))
+
+    return len(delivered), len(failed)
+
+
+def deliver(pool, limit=500, concurrency=None):
+    """
+    One delivery round. Returns (delivered, failed) event counts.
+    """
+
+    deliveries = _claim(limit)
+    if not deliveries:
+        return 0, 0
+
+    results, outcomes = asyncio.run(_send_all(
+        list(_batches(deliveries)),
+        pool,
+        concurrency or settings.WEBHOOK_CONCURRENCY,
+    ))
+
+    return _record(results, outcomes, lease=deliveries[0].next_attempt_at)
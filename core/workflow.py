@@ -0,0 +1,152 @@
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ApprovalStep, ApprovalTask, TaskConflict, User
+
+
+# =========================================================
+# WORKFLOW ENGINE
+#
+# Every decision costs a fixed number of queries, however
+# many approvers the task has:
+#   1. bump the stage counter on the task (locks the task row)
+#   2. mark the approver's step decided
+#   3. read the counters back
+#   4. only when the stage closes: skip leftovers, open the
+#      next stage (or finish the task)
+# =========================================================
+
+def build_plan(workflow, route=None):
+    """
+    Freezes a workflow into (stage_plan, approvers per stage).
+    Stages without approvers are left out.
+    `route` maps an approver id to whoever acts for them
+    (delegation); a stage never gets the same person twice.
+    """
+
+    plan = []
+    stage_approvers = []
+
+    stages = list(workflow.stages.prefetch_related("approvers"))
+
+    users = {}
+    if route:
+        ids = {route(user.id) for stage in stages for user in stage.approvers.all()}
+        users = User.objects.in_bulk(ids)
+
+    for stage in stages:
+        approvers = list(stage.approvers.all())
+
+        if route:
+            approvers = [users[user_id] for user_id in dict.fromkeys(route(user.id) for user in approvers)]
+
+        if not approvers:
+            continue
+
+        plan.append({
+            "size": len(approvers),
+            "required": stage.required_approvals(len(approvers)),
+        })
+        stage_approvers.append(approvers)
+
+    if not plan:
+        raise ValueError(f"Workflow '{workflow.name}' has no approvers")
+
+    return plan, stage_approvers
+
+
+def create_steps(task, stage_approvers):
+    """
+    One bulk insert for every step of every stage.
+    Stage 0 is open immediately, the rest wait.
+    """
+
+    ApprovalStep.objects.bulk_create([
+        ApprovalStep(
+            task=task,
+            stage=index,
+            approver=approver,
+            status="PENDING" if index == 0 else "WAITING",
+        )
+        for index, approvers in enumerate(stage_approvers)
+        for approver in approvers
+    ])
+
+
+def record_decision(step, approved):
+    """
+    Applies one approver's decision.
+
+    Returns "APPROVED" / "REJECTED" when the task is finished,
+    "ADVANCED" when the next stage was opened, or None when the
+    current stage is still collecting decisions.
+    Raises TaskConflict if the step or stage is no longer open.
+    """
+
+    now = timezone.now()
+    counter = "stage_approved" if approved else "stage_rejected"
+
+    with transaction.atomic(using=router.db_for_write(ApprovalTask)):
+        # The task row is always locked first, so two approvers of
+        # the same stage queue here instead of deadlocking later.
+        # updated_at moves too: it keys the dashboard row caches.
+        bumped = ApprovalTask.objects.filter(
+            pk=step.task_id,
+            status="PENDING",
+            current_stage=step.stage,
+        ).update(updated_at=now, **{counter: F(counter) + 1})
+
+        if not bumped:
+            raise TaskConflict("This stage is no longer open")
+
+        decided = ApprovalStep.objects.filter(
+            pk=step.pk,
+            status="PENDING",
+        ).update(
+            status="APPROVED" if approved else "REJECTED",
+            decided_at=now,
+        )
+
+        if not decided:
+            raise TaskConflict("This step was already decided")
+
+        task = ApprovalTask.objects.get(pk=step.task_id)
+        rule = task.stage_plan[step.stage]
+
+        if task.stage_approved >= rule["required"]:
+            passed = True
+        elif task.stage_rejected > rule["size"] - rule["required"]:
+            # Not enough approvers left to reach the rule
+            passed = False
+        else:
+            return None
+
+        # The stage is closed: nobody else needs to act on it
+        ApprovalStep.objects.filter(
+            task=task,
+            stage=step.stage,
+            status="PENDING",
+        ).update(status="SKIPPED")
+
+        next_stage = step.stage + 1
+
+        if not passed or next_stage >= len(task.stage_plan):
+            if not passed:
+                ApprovalStep.objects.filter(task=task, status="WAITING").update(status="SKIPPED")
+
+            task.apply(status="APPROVED" if passed else "REJECTED")
+            return task.status
+
+        ApprovalStep.objects.filter(task=task, stage=next_stage).update(status="PENDING")
+
+        task.apply(
+            current_stage=next_stage,
+            stage_approved=0,
+            stage_rejected=0,
+            approver_id=ApprovalStep.objects.filter(
+                task=task,
+                stage=next_stage,
+            ).values_list("approver_id", flat=True).first(),
+        )
+        return "ADVANCED"